@@ -1,23 +1,32 @@
-from .core import (
-    local_instance,
-    config,
-    network,
-    remux,
-    wrapper,
-    manager,
-    download,
-    remuxer,
-)
-from .misc.tracker import get_tracker
+from importlib import import_module
 
 # pybalt version
 VERSION = "2025.7.1"
 
-# Initialize tracker
-tracker = get_tracker()
+__all__ = ["VERSION", "network", "local_instance", "config", "wrapper", "manager", "download", "remuxer", "remux", "tracker", "Cobalt"]
 
-# Backwards compatibility
-Cobalt = wrapper.Cobalt
-client = network
+# Everything else lives in pybalt.core and is imported on first access, keeping `import pybalt` cheap
+_LAZY_ATTRIBUTES = {
+    "local_instance": "local_instance",
+    "config": "config",
+    "network": "network",
+    "client": "network",  # Backwards compatibility
+    "remux": "remux",
+    "wrapper": "wrapper",
+    "manager": "manager",
+    "download": "download",
+    "remuxer": "remuxer",
+    "tracker": "tracker",
+}
 
-__all__ = ["VERSION", "network", "local_instance", "config", "wrapper", "manager", "download", "remuxer", "remux", "tracker", "Cobalt"]
+
+def __getattr__(name):
+    if name == "Cobalt":
+        # Backwards compatibility
+        value = import_module(".core.wrapper", __name__).Cobalt
+    elif name in _LAZY_ATTRIBUTES:
+        value = getattr(import_module(".core", __name__), _LAZY_ATTRIBUTES[name])
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
@@ -4,24 +4,28 @@ from typing import _LiteralGenericAlias
 from os.path import exists, isfile
 import argparse
 from pathlib import Path
+from contextlib import nullcontext
 from . import VERSION
-from .core import config
-from .core.remux import Remuxer
+from .core import config, logging_utils, metrics, tracing
+from .core.journal import Journal
+from .core.loop_monitor import LoopLagMonitor
+from .core.remux import Remuxer, RemuxError
 import threading
 import subprocess
+import asyncio
 import os
 import signal
 import sys
-import requests
 import time
-from .misc import api
 
 
 def create_parser():
     parser = argparse.ArgumentParser(
         description="pybalt - Your ultimate tool & python module to download videos and audio from various platforms. Supports YouTube, Instagram, Twitter (X), Reddit, TikTok, BiliBili & More! Powered by cobalt instances"
     )
-    parser.add_argument("positional", nargs="?", type=str, help="URL to download, file path to remux, or text file with URLs")
+    parser.add_argument(
+        "positional", nargs="?", type=str, help="URL to download, file path to remux, text file with URLs, or - to read URLs from stdin"
+    )
 
     # Add arguments based on CobaltRequestParams
     for key, value in CobaltRequestParams.__annotations__.items():
@@ -67,6 +71,16 @@ def create_parser():
     download_group.add_argument("-fp", "--folder-path", type=str, help="Download folder path")
     download_group.add_argument("-t", "--timeout", type=int, help="Download timeout in seconds")
     download_group.add_argument("-pt", "--progressive-timeout", action="store_true", help="Enable progressive timeout")
+    download_group.add_argument("-rd", "--remux-dir", type=str, metavar="DIR", help="Remux every media file in a directory tree")
+    download_group.add_argument("-j", "--jobs", type=int, help="Number of files processed in parallel")
+    download_group.add_argument(
+        "--stdin", action="store_true", help="Read URLs from stdin as they arrive and write one NDJSON result per URL to stdout"
+    )
+    download_group.add_argument(
+        "--journal",
+        metavar="FILE",
+        help="Record progress in a SQLite journal, rerunning with the same journal skips finished URLs and resumes partial files",
+    )
 
     # Add instance management options
     instance_group = parser.add_argument_group("Instance management")
@@ -92,6 +106,9 @@ def create_parser():
     local_group.add_argument("-lstop", "--local-stop", action="store_true", help="Stop local instance")
     local_group.add_argument("-lrestart", "--local-restart", action="store_true", help="Restart local instance")
     local_group.add_argument("-lstatus", "--local-status", action="store_true", help="Check local instance status")
+    local_group.add_argument(
+        "--replicas", type=int, help="Number of local cobalt containers to set up on consecutive ports, used with --local-setup"
+    )
 
     # Add API management options
     api_group = parser.add_argument_group("API management")
@@ -103,10 +120,49 @@ def create_parser():
     # Misc arguments
     misc_group = parser.add_argument_group("Miscellaneous")
     misc_group.add_argument("-y", "--yes", action="store_true", help="Automatically answer yes to prompts")
+    misc_group.add_argument("--fast", action="store_true", help="Skip update checks, notices and other non-essential startup work")
+    misc_group.add_argument(
+        "--progress", choices=["bar", "ndjson"], default="bar", help="Show a progress bar or write NDJSON progress events instead"
+    )
+    misc_group.add_argument("--progress-fd", type=int, default=2, help="File descriptor for NDJSON progress events (default: stderr)")
+    misc_group.add_argument("--progress-interval", type=float, default=1.0, help="Seconds between NDJSON progress events")
+    misc_group.add_argument("--metrics-file", help="Write Prometheus metrics to this file when the command finishes")
+    misc_group.add_argument(
+        "--profile", metavar="FILE", help="Profile the run with cProfile, write the profile to FILE and a summary to FILE.txt"
+    )
+    misc_group.add_argument("--trace", metavar="FILE", help="Record a Chrome trace of the run to FILE, open it in ui.perfetto.dev")
 
     return parser
 
 
+def get_cobalt_params(args):
+    """Collect the Cobalt API request parameters given on the command line"""
+    cobalt_params = {}
+    for key in CobaltRequestParams.__annotations__:
+        if key != "url" and hasattr(args, key) and getattr(args, key) is not None:
+            cobalt_params[key] = getattr(args, key)
+    return cobalt_params
+
+
+def open_result(path, args):
+    """Handle the open and show arguments for a downloaded or remuxed file"""
+    if args.open:
+        from .utils.file_operations import open_file
+
+        if open_file(path):
+            print(f"Opened file: {path}")
+        else:
+            print(f"Failed to open file: {path}")
+
+    if args.show:
+        from .utils.file_operations import show_in_explorer
+
+        if show_in_explorer(path):
+            print(f"Showing file in explorer: {path}")
+        else:
+            print(f"Failed to show file in explorer: {path}")
+
+
 async def download_url(url, args):
     # Remove any trailing slashes and backslashes
     url = url.strip().replace("\\", "")
@@ -115,15 +171,10 @@ async def download_url(url, args):
     print(f"Downloading: {url}")
 
     # Prepare Cobalt parameters
-    cobalt_params = {}
-    for key in CobaltRequestParams.__annotations__:
-        if hasattr(args, key) and getattr(args, key) is not None:
-            cobalt_params[key] = getattr(args, key)
+    cobalt_params = get_cobalt_params(args)
 
-    # Prepare download options
-    download_opts = {
-        "remux": args.remux,
-    }
+    # Prepare download options, remuxing is done below so --keep-original is respected
+    download_opts = {}
 
     if args.folder_path:
         download_opts["folder_path"] = args.folder_path
@@ -135,7 +186,6 @@ async def download_url(url, args):
     # Initialize the manager and download
     manager = InstanceManager()
     try:
-        del cobalt_params["url"]
         result = await manager.download(
             url=url,
             **download_opts,
@@ -146,26 +196,13 @@ async def download_url(url, args):
             if args.remux:
                 # Remux the file if requested and download succeeded
                 print(f"Remuxing: {result}")
-                remuxed = Remuxer().remux(result, keep_original=args.keep_original)
-                print(f"Remuxed to: {remuxed}")
-                result = remuxed  # Update result to point to the remuxed file
+                try:
+                    result = await Remuxer().remux_async(result, keep_original=args.keep_original)
+                    print(f"Remuxed to: {result}")
+                except RemuxError as e:
+                    print(f"Failed to remux {result}: {e}")
 
-            # Handle the open and show arguments
-            if args.open:
-                from .utils.file_operations import open_file
-
-                if open_file(result):
-                    print(f"Opened file: {result}")
-                else:
-                    print(f"Failed to open file: {result}")
-
-            if args.show:
-                from .utils.file_operations import show_in_explorer
-
-                if show_in_explorer(result):
-                    print(f"Showing file in explorer: {result}")
-                else:
-                    print(f"Failed to show file in explorer: {result}")
+            open_result(result, args)
 
         return result
     except Exception as e:
@@ -181,36 +218,20 @@ async def process_input(args):
             with open(args.positional, "r") as f:
                 urls = [line.strip() for line in f.readlines() if line.strip()]
 
-            results = []
-            for url in urls:
-                result = await download_url(url, args)
-                if result:
-                    results.append(result)
-            return results
+            return await download_batch(urls, args)
 
         elif exists(args.positional) and not args.url:
             # It's a file to remux
             # if args.remux:
             print(f"Remuxing file: {args.positional}")
-            result = Remuxer().remux(args.positional, keep_original=args.keep_original)
+            try:
+                result = await Remuxer().remux_async(args.positional, keep_original=args.keep_original)
+            except RemuxError as e:
+                print(f"Failed to remux {args.positional}: {e}")
+                return None
             print(f"Remuxed to: {result}")
 
-            # Handle the open and show arguments for remuxed files
-            if args.open:
-                from .utils.file_operations import open_file
-
-                if open_file(result):
-                    print(f"Opened file: {result}")
-                else:
-                    print(f"Failed to open file: {result}")
-
-            if args.show:
-                from .utils.file_operations import show_in_explorer
-
-                if show_in_explorer(result):
-                    print(f"Showing file in explorer: {result}")
-                else:
-                    print(f"Failed to show file in explorer: {result}")
+            open_result(result, args)
 
             return result
             # else:
@@ -223,6 +244,111 @@ async def process_input(args):
         return await download_url(args.url, args)
 
 
+async def download_batch(urls, args):
+    """Download a list of URLs concurrently through a single InstanceManager and summarize the failures"""
+    urls = [url.strip().replace("\\", "") for url in urls]
+    print(f"Downloading {len(urls)} URLs")
+
+    manager = InstanceManager()
+    results, failures = [], []
+    with Journal(args.journal) if args.journal else nullcontext() as journal:
+        async for url, file_path, error in manager.download_generator(
+            urls=urls,
+            only_path=False,
+            remux=args.remux,
+            keep_original=args.keep_original,
+            folder_path=args.folder_path,
+            max_concurrent=args.jobs,
+            journal=journal,
+            dedupe=config.get_config().get("dedupe_urls", True, section="misc"),
+            **get_cobalt_params(args),
+        ):
+            if error is not None or not file_path:
+                failures.append((url, error))
+                continue
+            results.append(file_path)
+            # Picker downloads give a list of files
+            for item in file_path if isinstance(file_path, list) else [file_path]:
+                open_result(item, args)
+
+    print(f"Downloaded {len(results)} of {len(results) + len(failures)} URLs, {len(failures)} failed")
+    for url, error in failures[:20]:
+        print(f"  {url}: {error or 'no file downloaded'}")
+    if len(failures) > 20:
+        print(f"  ... and {len(failures) - 20} more")
+    return results
+
+
+async def read_stdin_urls(max_pending: int = 1):
+    """Yield URLs from stdin as lines arrive, the reader thread blocks once max_pending URLs are waiting"""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(max_pending)
+
+    def reader():
+        for line in sys.stdin:
+            url = line.strip().replace("\\", "")
+            if url:
+                asyncio.run_coroutine_threadsafe(queue.put(url), loop).result()
+        asyncio.run_coroutine_threadsafe(queue.put(None), loop).result()
+
+    threading.Thread(target=reader, name="pybalt-stdin", daemon=True).start()
+    while (url := await queue.get()) is not None:
+        yield url
+
+
+async def download_stdin(args):
+    """Download URLs from stdin or a named pipe as they arrive, writing one NDJSON result per URL to stdout"""
+    from .misc.tracker import get_tracker, ndjson_emitter
+
+    # stdout carries the results, so the progress bar must not draw over them
+    get_tracker().set_quiet()
+    emit = ndjson_emitter(1)
+
+    manager = InstanceManager()
+    with Journal(args.journal) if args.journal else nullcontext() as journal:
+        async for result in manager.download_generator(
+            urls=read_stdin_urls(args.jobs or 1),
+            only_path=False,
+            remux=args.remux,
+            keep_original=args.keep_original,
+            folder_path=args.folder_path,
+            max_concurrent=args.jobs,
+            journal=journal,
+            dedupe=config.get_config().get("dedupe_urls", True, section="misc"),
+            **get_cobalt_params(args),
+        ):
+            file_path = result.file_path
+            if isinstance(file_path, list):
+                file_path = [str(path) for path in file_path]
+            elif file_path is not None:
+                file_path = str(file_path)
+            emit(
+                {
+                    "url": result.url,
+                    "path": file_path,
+                    "error": str(result.error) if result.error is not None else None,
+                    "timing": result.timing.as_dict() if result.timing is not None else None,
+                }
+            )
+
+
+async def handle_remux_dir(args):
+    """Remux every media file in a directory tree, resuming from the index of previous runs"""
+    from .misc.tracker import lprint
+
+    if not Path(args.remux_dir).is_dir():
+        print(f"Not a directory: {args.remux_dir}")
+        return None
+
+    def on_progress(total, done, failed, current, **kwargs):
+        lprint(f":cyan:Remuxing :white:{current.name}", f":green:{done + failed}/{total} :red:{failed} failed", end="\r")
+
+    stats = await Remuxer().remux_tree(args.remux_dir, jobs=args.jobs, keep_original=args.keep_original, progress_callback=on_progress)
+    print()
+    print(f"Remuxed {stats['done'] - stats['skipped']} files, {stats['skipped']} already done, {stats['failed']} failed")
+    return stats
+
+
 async def handle_local_instance(args):
     """Handle local instance commands"""
     from .core.local import LocalInstance
@@ -230,7 +356,7 @@ async def handle_local_instance(args):
     local = LocalInstance()
 
     if args.local_setup:
-        local.setup_wizard()
+        local.setup_wizard(replicas=args.replicas)
     elif args.local_start:
         try:
             if local.start_instance():
@@ -256,6 +382,8 @@ async def handle_local_instance(args):
         if status.get("running"):
             port = local.config.get_as_number("local_instance_port", 9000, "local")
             print(f"Local instance is running on http://localhost:{port}/")
+            if local.replicas > 1:
+                print(f"{status.get('replicas_running', 1)}/{local.replicas} replicas running on ports {port}-{port + local.replicas - 1}")
         else:
             print("Local instance is not running")
             if "message" in status:
@@ -264,7 +392,7 @@ async def handle_local_instance(args):
 
 async def handle_instance_management(args):
     """Handle instance management commands"""
-    cfg = config.Config()
+    cfg = config.get_config()
 
     if args.list_instances:
         instances = cfg.get_user_instances()
@@ -309,7 +437,7 @@ async def handle_instance_management(args):
 
 async def handle_config(args):
     """Handle configuration commands"""
-    cfg = config.Config()
+    cfg = config.get_config()
 
     if args.config:
         # Open configuration interface
@@ -329,7 +457,7 @@ async def handle_config(args):
 
 def get_api_pid_file():
     """Get the path to the file storing the API process ID"""
-    cfg = config.Config()
+    cfg = config.get_config()
     config_dir = Path(cfg._get_config_dir())
     return config_dir / "api_pid.txt"
 
@@ -379,7 +507,9 @@ def is_process_running(pid):
 
 async def handle_api_commands(args):
     """Handle API management commands"""
-    cfg = config.Config()
+    import requests
+
+    cfg = config.get_config()
 
     if args.api_port:
         # Update the API port in the config
@@ -402,6 +532,9 @@ async def handle_api_commands(args):
 
         # Start the API in a new process
         cmd = [sys.executable, "-m", "pybalt.misc.api", str(port)]
+        if args.profile:
+            # The server writes the profile when it's stopped
+            cmd += ["--profile", str(Path(args.profile).resolve())]
 
         if sys.platform == "win32":
             # On Windows, use CREATE_NEW_PROCESS_GROUP flag to create a detached process
@@ -496,15 +629,15 @@ async def handle_api_commands(args):
 
 
 def check_for_updates():
-    """Check for updates to pybalt on PyPI"""
-    cfg = config.Config()
+    """Check for updates to pybalt on PyPI and cache the latest version in the state file"""
+    cfg = config.get_config()
 
     # Skip if update checking is disabled
     if not cfg.get("update_check_enabled", True, "misc"):
         return None
 
     # Check the last update check time
-    last_check = int(cfg.get("last_update_check", 0, "misc"))
+    last_check = int(cfg.get_state("last_update_check", 0))
     interval = int(cfg.get("update_check_interval", 86400, "misc"))
     current_time = int(time.time())
 
@@ -512,16 +645,19 @@ def check_for_updates():
     if current_time - last_check < interval:
         return None
 
+    # Record the check before making it, short commands exit and kill this thread before the response arrives
+    cfg.set_state("last_update_check", current_time)
+
+    import requests
+
     try:
         # Set a short timeout to prevent blocking the application
         response = requests.get("https://pypi.org/pypi/pybalt/json", timeout=3)
 
-        # Update the last check time regardless of success
-        cfg.set("last_update_check", str(current_time), "misc")
-
         if response.status_code == 200:
             data = response.json()
             latest_version = data["info"]["version"]
+            cfg.set_state("latest_version", latest_version)
 
             if latest_version != VERSION:
                 return latest_version
@@ -532,12 +668,28 @@ def check_for_updates():
     return None
 
 
+def start_update_check():
+    """Run check_for_updates in a daemon thread, so it never delays the command itself"""
+    threading.Thread(target=check_for_updates, name="pybalt-update-check", daemon=True).start()
+
+
+def show_update_notice():
+    """Show the result of the last background update check, once for every newer version found"""
+    cfg = config.get_config()
+    latest_version = cfg.get_state("latest_version")
+    if latest_version and latest_version != VERSION and cfg.get_state("announced_version") != latest_version:
+        print(f"A new version of pybalt is available: {latest_version}")
+        print(f"You're currently using version {VERSION}")
+        print("Update with: pip install --upgrade pybalt")
+        cfg.set_state("announced_version", latest_version)
+
+
 def show_thank_you():
     """Show a thank you message at most once every 3 hours"""
-    cfg = config.Config()
+    cfg = config.get_config()
 
     # Check the last thank you time
-    last_thank = int(cfg.get("last_thank", 0, "misc"))
+    last_thank = int(cfg.get_state("last_thank", 0))
     current_time = int(time.time())
 
     # Show message if it's been more than 3 hours (10800 seconds)
@@ -547,19 +699,58 @@ def show_thank_you():
         )
 
         # Update the last thank you time
-        cfg.set("last_thank", str(current_time), "misc")
+        cfg.set_state("last_thank", current_time)
 
 
 async def main_async():
     parser = create_parser()
     args = parser.parse_args()
 
-    # Check for updates (max once per update_check_interval, default 24h)
-    latest_version = check_for_updates()
-    if latest_version:
-        print(f"A new version of pybalt is available: {latest_version}")
-        print(f"You're currently using version {VERSION}")
-        print("Update with: pip install --upgrade pybalt")
+    # Notices and log lines would end up between the NDJSON results when reading URLs from stdin
+    if args.stdin or args.positional == "-":
+        logging_utils.set_console_stream(sys.stderr)
+    if args.fast or args.stdin or args.positional == "-":
+        os.environ["PYBALT_FAST"] = "1"
+    fast = config.is_fast_mode()
+
+    if args.progress == "ndjson":
+        from .misc.tracker import get_tracker, ndjson_emitter
+
+        get_tracker().set_emitter(ndjson_emitter(args.progress_fd), args.progress_interval)
+
+    if args.trace:
+        tracing.start_tracing()
+
+    # With --api-start the flag is only forwarded, the detached server profiles itself and writes the files
+    profiler = None
+    if args.profile and not args.api_start:
+        from .core.profiling import Profiler
+
+        profiler = Profiler()
+        profiler.start()
+
+    # Report anything that blocks the event loop during the run
+    loop_monitor = LoopLagMonitor()
+    loop_monitor.start()
+
+    try:
+        await run_command(args, parser, fast)
+    finally:
+        loop_monitor.stop()
+        if args.metrics_file:
+            metrics.registry.write(args.metrics_file)
+        if args.trace:
+            tracing.stop_tracing().write(args.trace)
+        if profiler:
+            profiler.stop()
+            print(profiler.write(args.profile), file=sys.stderr)
+
+
+async def run_command(args, parser, fast):
+    # Check for updates in the background (max once per update_check_interval, default 24h)
+    if not fast:
+        show_update_notice()
+        start_update_check()
 
     # Show version information
     if args.version:
@@ -586,10 +777,21 @@ async def main_async():
         await handle_config(args)
         return
 
+    # Handle directory remux
+    if args.remux_dir:
+        await handle_remux_dir(args)
+        return
+
+    # Handle streaming downloads from stdin
+    if args.stdin or args.positional == "-":
+        await download_stdin(args)
+        return
+
     # Handle download/remux
     if args.positional or args.url:
         await process_input(args)
-        show_thank_you()
+        if not fast:
+            show_thank_you()
     else:
         parser.print_help()
 
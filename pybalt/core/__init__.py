@@ -1,14 +1,33 @@
-from . import local as local_instance, config, network, remux, wrapper
-from ..misc.tracker import get_tracker
+from . import local as local_instance, config, loop_monitor, metrics, network, remux as _remux, wrapper
 
-# Initialize config first to ensure logging is set up
-_config = config.Config()
+__all__ = ["network", "local_instance", "config", "metrics", "wrapper", "manager", "download", "remuxer", "remux", "tracker", "_config"]
 
-manager = wrapper.InstanceManager()
-download = manager.download
-detached = manager
-remuxer = remux.Remuxer()
-remux = remuxer.remux
-tracker = get_tracker()
+# Shared instances are created on first access, so importing pybalt.core has no side effects
+_singletons = {}
 
-__all__ = ["network", "local_instance", "config", "wrapper", "manager", "download", "remuxer", "remux", "tracker", "_config"]
+
+def __getattr__(name):
+    if name not in ("manager", "detached", "remuxer", "tracker", "_config"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if name not in _singletons:
+        if name == "_config":
+            _singletons[name] = config.get_config()
+        elif name in ("manager", "detached"):
+            _singletons["manager"] = _singletons["detached"] = wrapper.InstanceManager()
+        elif name == "remuxer":
+            _singletons[name] = _remux.Remuxer()
+        elif name == "tracker":
+            from ..misc.tracker import get_tracker
+
+            _singletons[name] = get_tracker()
+    return _singletons[name]
+
+
+async def download(*args, **kwargs):
+    """Download with the shared InstanceManager, see InstanceManager.download."""
+    return await __getattr__("manager").download(*args, **kwargs)
+
+
+def remux(*args, **kwargs):
+    """Remux with the shared Remuxer, see Remuxer.remux."""
+    return __getattr__("remuxer").remux(*args, **kwargs)
@@ -4,23 +4,31 @@ import platform
 from pathlib import Path
 import sys
 import subprocess
-from typing import Optional, Dict, Any, List, Union
+import threading
+import asyncio
+import json
+import tempfile
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Coroutine, Iterator, Optional, Dict, Any, List, Union
+from types import SimpleNamespace
+from time import monotonic
 from asyncio import get_event_loop, new_event_loop
 from dotenv import load_dotenv
 
-try:
-    from prompt_toolkit import Application
-    from prompt_toolkit.layout.containers import Window, HSplit
-    from prompt_toolkit.layout.controls import FormattedTextControl
-    from prompt_toolkit.layout.layout import Layout
-    from prompt_toolkit.key_binding import KeyBindings
-    from prompt_toolkit.styles import Style
 
-    HAS_PROMPT_TOOLKIT = True
-except ImportError:
-    HAS_PROMPT_TOOLKIT = False
-    print("Warning: prompt_toolkit is not installed. CLI config editing will not be available.")
-    print("Install with: pip install prompt_toolkit")
+class ConfigSnapshot:
+    """
+    Typed, read-only view of every known setting with environment overrides applied.
+
+    Sections are exposed as attributes, e.g. `config.snapshot.network.download_buffer_size`.
+    """
+
+    def __init__(self, values: Dict[str, Dict[str, Any]], mtime: Optional[int] = None):
+        self.values = values
+        self.mtime = mtime
+        for section, options in values.items():
+            setattr(self, section, SimpleNamespace(**options))
 
 
 class Config:
@@ -68,16 +76,28 @@ class Config:
             "use_pc_proxy": "True",
             "network_mode": "host",
             "proxy_url": "",
+            "health_check_ttl": "10",  # Seconds a local instance health check is cached
+            "replicas": "1",  # cobalt containers on consecutive ports starting at local_instance_port
+        },
+        "ffmpeg": {
+            "remux_args": "-hwaccel opencl",
+            "keep_original": "True",
+            "remux_timeout": "0",  # 0 means no limit
+            "max_concurrent_remuxes": "0",  # 0 means the number of CPU cores
+            "stream_remux": "False",  # Remux while downloading instead of writing the file twice
+            "skip_clean_remux": "True",  # Skip files ffprobe reports as already clean
+        },
+        "api": {
+            "port": "8009",
+            "update_period": "120",
+            "config_reload_interval": "5",  # Seconds between config file checks, 0 disables hot reload
         },
-        "ffmpeg": {"remux_args": "-hwaccel opencl", "keep_original": "True"},
-        "api": {"port": "8009", "update_period": "120"},
         "misc": {
-            "last_update_check": "0",
             "update_check_interval": "86400",
             "update_check_enabled": "True",
             "allow_bulk_download": "True",
-            "last_thank": "0",
-            "last_warn": "0",
+            "dedupe_urls": "True",  # The CLI skips links to media that is already queued in the same run
+            "loop_lag_threshold": "0.5",  # Seconds the event loop may stall before the blocking call is reported, 0 disables
         },
         "display": {
             "enable_tracker": "True",
@@ -117,18 +137,29 @@ class Config:
         "progress_bar_width",
         "max_visible_items",
         "port",
-        "last_update_check",
         "update_check_interval",
         "duration_limit",
         "draw_interval",
         "min_redraw_interval",
-        "last_thank",
         "max_log_files",
         "max_log_size_mb",
-        "last_warn",
+        "remux_timeout",
+        "max_concurrent_remuxes",
+        "config_reload_interval",
+        "loop_lag_threshold",
+        "health_check_ttl",
+        "replicas",
     }
 
+    # Minimum time in seconds between checks of the config file's mtime
+    SNAPSHOT_CHECK_INTERVAL = 1.0
+
     def __init__(self):
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._snapshot_checked = 0.0
+        self._lock = threading.RLock()
+        self._state: Optional[Dict[str, Any]] = None
+
         # Create a mapping of unique keys to their sections
         self.key_to_section = {}
         self._build_key_section_map()
@@ -255,9 +286,13 @@ class Config:
 
     def load_config(self) -> None:
         """Load the configuration from the file."""
+        self._snapshot = None
         try:
             if self.config_path.exists():
-                self.config.read(self.config_path)
+                # Parse into a fresh parser and swap it in, so readers on other threads never see a half-loaded config
+                config = configparser.ConfigParser()
+                config.read(self.config_path)
+                self.config = config
                 self._config_accessible = True
                 if hasattr(self, "logger"):
                     self.logger.debug(f"Loaded config from {self.config_path}")
@@ -271,6 +306,7 @@ class Config:
 
     def save_config(self) -> None:
         """Save the current configuration to the file."""
+        self._snapshot = None
         if not self._config_accessible:
             error_msg = "Config file is not accessible. Changes will not be saved."
             if hasattr(self, "logger"):
@@ -280,7 +316,7 @@ class Config:
             return
 
         try:
-            with open(self.config_path, "w") as config_file:
+            with self._lock, open(self.config_path, "w") as config_file:
                 self.config.write(config_file)
             if hasattr(self, "logger"):
                 self.logger.debug(f"Saved config to {self.config_path}")
@@ -304,14 +340,102 @@ class Config:
             return self._get_config_dir() / "logs"
         return Path(log_folder)
 
+    def get_state(self, key: str, fallback: Any = None) -> Any:
+        """
+        Get a value from state.json, which keeps timestamps and caches that aren't user settings.
+
+        Args:
+            key: The state key.
+            fallback: Value to return if the key is not set.
+        """
+        if self._state is None:
+            try:
+                with open(self.config_path.parent / "state.json", "r", encoding="utf-8") as state_file:
+                    self._state = json.load(state_file)
+            except (OSError, ValueError):
+                self._state = {}
+        return self._state.get(key, fallback)
+
+    def set_state(self, key: str, value: Any) -> None:
+        """
+        Store a JSON-serializable value in state.json without touching the config file.
+
+        Args:
+            key: The state key.
+            value: The value to store.
+        """
+        with self._lock:
+            # Re-read first, so keys other processes wrote since our last read aren't overwritten with stale values
+            self._state = None
+            self.get_state(key)
+            self._state[key] = value
+            state_path = self.config_path.parent / "state.json"
+            temp_path = None
+            try:
+                # A unique temp file per writer, so concurrent processes never replace each other's half-written file
+                with tempfile.NamedTemporaryFile(
+                    "w", dir=state_path.parent, prefix="state.", suffix=".tmp", delete=False, encoding="utf-8"
+                ) as state_file:
+                    temp_path = state_file.name
+                    json.dump(self._state, state_file)
+                os.replace(temp_path, state_path)
+            except OSError as e:
+                if temp_path and os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                if hasattr(self, "logger"):
+                    self.logger.debug(f"Cannot write state file at {state_path}: {e}")
+
     def _find_section_for_key(self, option: str) -> Optional[str]:
         """Find which section a key belongs to if it's unique across sections."""
         return self.key_to_section.get(option)
 
+    def _get_config_mtime(self) -> Optional[int]:
+        try:
+            return self.config_path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        """
+        Get the compiled snapshot of all settings, rebuilding it if the config changed.
+
+        The snapshot is dropped on every save or load, and the config file's mtime is checked at most
+        once per SNAPSHOT_CHECK_INTERVAL so edits made by other processes are picked up as well.
+        """
+        snapshot = self._snapshot
+        now = monotonic()
+        if snapshot is not None and now - self._snapshot_checked < self.SNAPSHOT_CHECK_INTERVAL:
+            return snapshot
+
+        with self._lock:
+            self._snapshot_checked = now
+            mtime = self._get_config_mtime()
+            if self._snapshot is not None and self._snapshot.mtime == mtime:
+                return self._snapshot
+            if self._snapshot is not None:
+                # File was changed outside of this instance
+                self.load_config()
+            return self._build_snapshot(mtime)
+
+    def _build_snapshot(self, mtime: Optional[int]) -> ConfigSnapshot:
+        """Resolve every option in VALUES and the config file once."""
+        values = {}
+        sections = list(self.VALUES) + [section for section in self.config.sections() if section not in self.VALUES]
+        for section in sections:
+            options = dict.fromkeys(self.VALUES.get(section, {}))
+            if self.config.has_section(section):
+                options.update(dict.fromkeys(self.config.options(section)))
+            values[section] = {option: self._resolve(option, None, section) for option in options}
+        self._snapshot = ConfigSnapshot(values, mtime)
+        return self._snapshot
+
     def get(self, option: str, fallback: Any = None, section: Optional[str] = None) -> Union[str, float, int, bool]:
         """
         Get a configuration value, checking environment variables first.
 
+        Known options are read from the cached snapshot, anything else is resolved on every call.
+
         Args:
             option: The option name.
             fallback: Value to return if the option is not found.
@@ -322,10 +446,18 @@ class Config:
         """
         # If section is not provided, try to determine it for unique keys
         if section is None:
-            section = self._find_section_for_key(option)
-            if section is None:
-                # If key isn't unique or doesn't exist, try misc as fallback
-                section = "misc"
+            # If key isn't unique or doesn't exist, try misc as fallback
+            section = self.key_to_section.get(option, "misc")
+
+        options = self.snapshot.values.get(section)
+        if options is not None:
+            value = options.get(option)
+            if value is not None:
+                return value
+        return self._resolve(option, fallback, section)
+
+    def _resolve(self, option: str, fallback: Any, section: str) -> Union[str, float, int, bool]:
+        """Resolve a configuration value from the environment, the config file and the defaults."""
 
         # Check for environment variable override
         if section:
@@ -470,11 +602,12 @@ class Config:
                 # If key isn't unique or doesn't exist, use misc
                 section = "misc"
 
-        if not self.config.has_section(section):
-            self.config.add_section(section)
+        with self._lock:
+            if not self.config.has_section(section):
+                self.config.add_section(section)
 
-        self.config.set(section, option, value)
-        self.save_config()
+            self.config.set(section, option, value)
+            self.save_config()
 
     def delete_option(self, option: str, section: Optional[str] = None) -> bool:
         """
@@ -752,6 +885,119 @@ class Config:
         return False
 
 
+def is_fast_mode() -> bool:
+    """Check the PYBALT_FAST switch, which skips update checks, notices and other non-essential startup work."""
+    return os.getenv("PYBALT_FAST", "").lower() in ("1", "true", "yes")
+
+
+_shared_config: Optional[Config] = None
+_shared_config_lock = threading.Lock()
+_config_override: ContextVar[Optional[Config]] = ContextVar("pybalt_config_override", default=None)
+
+
+def get_config() -> Config:
+    """
+    Get the process-wide Config, parsing the config file on first use.
+
+    Inside a config_override block the overriding Config is returned instead.
+    """
+    global _shared_config
+    override = _config_override.get()
+    if override is not None:
+        return override
+    if _shared_config is None:
+        with _shared_config_lock:
+            if _shared_config is None:
+                _shared_config = Config()
+    return _shared_config
+
+
+@contextmanager
+def config_override(config: Optional[Config] = None) -> Iterator[Config]:
+    """
+    Make get_config return a separate Config for the current thread or task.
+
+    Usage:
+        with config_override() as config:
+            config.set("max_retries", "5", "network")
+            manager = InstanceManager()
+
+    Args:
+        config: Config to use, a freshly loaded one if not provided
+    """
+    config = config or Config()
+    token = _config_override.set(config)
+    try:
+        yield config
+    finally:
+        _config_override.reset(token)
+
+
+class ConfigWatcher:
+    """
+    Polls the config file's mtime and reloads the config when it changes.
+
+    Usage:
+        watcher = ConfigWatcher(config)
+        watcher.add_callback(manager.apply_config)
+        watcher.start()
+    """
+
+    def __init__(self, config: Optional[Config] = None, interval: Optional[float] = None):
+        self.config = config or get_config()
+        self.interval = interval if interval is not None else self.config.get_as_number("config_reload_interval", 5, "api")
+        self.callbacks: List[Union[Callable, Coroutine]] = []
+        self._mtime = self.config._get_config_mtime()
+        self._task: Optional[asyncio.Task] = None
+
+    def add_callback(self, callback: Union[Callable, Coroutine]) -> None:
+        """Register a callback called with the reloaded Config."""
+        self.callbacks.append(callback)
+
+    async def check(self) -> bool:
+        """
+        Reload the config and run the callbacks if the file changed since the last check.
+
+        Returns:
+            True if the config was reloaded
+        """
+        mtime = self.config._get_config_mtime()
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        self.config.load_config()
+        self.config.logger.info(f"Reloaded config from {self.config.config_path}")
+        for callback in self.callbacks:
+            try:
+                if asyncio.iscoroutinefunction(callback):
+                    await callback(self.config)
+                else:
+                    callback(self.config)
+            except Exception as e:
+                self.config.logger.warning(f"Config reload callback {callback} failed: {e}")
+        return True
+
+    def start(self) -> Optional[asyncio.Task]:
+        """Start polling in the running event loop, does nothing if the interval is 0."""
+        if self.interval <= 0 or self._task is not None:
+            return self._task
+        self._task = asyncio.create_task(self._run())
+        return self._task
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as e:
+                self.config.logger.warning(f"Failed to reload config: {e}")
+
+
 def open_in_explorer(path):
     """
     Open a file or directory in the system's file explorer.
@@ -807,7 +1053,15 @@ def create_cli_app(config: Config):
     Args:
         config: The Config instance to edit.
     """
-    if not HAS_PROMPT_TOOLKIT:
+    # Imported here so prompt_toolkit is only loaded when the editor is actually opened
+    try:
+        from prompt_toolkit import Application
+        from prompt_toolkit.layout.containers import Window, HSplit
+        from prompt_toolkit.layout.controls import FormattedTextControl
+        from prompt_toolkit.layout.layout import Layout
+        from prompt_toolkit.key_binding import KeyBindings
+        from prompt_toolkit.styles import Style
+    except ImportError:
         print("Error: prompt_toolkit is required for the CLI. Install with pip install prompt_toolkit")
         return
 
@@ -1353,7 +1607,7 @@ async def async_main():
     """
     Async-compatible version of the main function for the configuration CLI utility.
     """
-    config = Config()
+    config = get_config()
     config.ensure_default_keys_exist()
 
     if len(sys.argv) > 1:
@@ -1426,7 +1680,7 @@ def main(force_cli: bool = False):
         pass
 
     # Regular synchronous path
-    config = Config()
+    config = get_config()
     config.ensure_default_keys_exist()
 
     if len(sys.argv) > 1 and not force_cli:
@@ -0,0 +1,123 @@
+from pathlib import Path
+from time import time
+from typing import Dict, List, Optional, Tuple
+import sqlite3
+import threading
+from .logging_utils import get_logger
+
+
+logger = get_logger(__name__)
+
+
+class Journal:
+    """
+    Durable record of download jobs in SQLite, so an interrupted bulk run can pick up where it stopped.
+
+    Every URL moves through queued, resolving, downloading and then done or failed. Updates are buffered
+    and written in a single transaction every flush_interval seconds or batch_size updates, and the database
+    runs in WAL mode, so keeping the journal doesn't slow downloads down. A crash loses at most the last
+    unflushed updates, those jobs are simply done again.
+
+    Usage:
+        with Journal("downloads.db") as journal:
+            async for result in manager.download_generator(urls=urls, journal=journal):
+                ...
+    """
+
+    QUEUED = "queued"
+    RESOLVING = "resolving"
+    DOWNLOADING = "downloading"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, path: Path | str, flush_interval: float = 1.0, batch_size: int = 1000):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        # Latest unwritten update per URL: (state, path, error, updated_at)
+        self._pending: Dict[str, Tuple[str, Optional[str], Optional[str], float]] = {}
+        self._last_flush = time()
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps the database consistent without syncing on every commit
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "url TEXT PRIMARY KEY, state TEXT NOT NULL, path TEXT, error TEXT, updated_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def state(self, url: str) -> Optional[str]:
+        """Return the last recorded state of a URL, or None if it was never queued."""
+        with self._lock:
+            pending = self._pending.get(url)
+            if pending is not None:
+                return pending[0]
+            row = self._db.execute("SELECT state FROM jobs WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def get(self, url: str) -> Optional[Dict[str, Optional[str]]]:
+        """Return the recorded state, path and error of a URL."""
+        with self._lock:
+            pending = self._pending.get(url)
+            if pending is None:
+                pending = self._db.execute("SELECT state, path, error, updated_at FROM jobs WHERE url = ?", (url,)).fetchone()
+        if pending is None:
+            return None
+        state, file_path, error, updated_at = pending
+        return {"state": state, "path": file_path, "error": error, "updated_at": updated_at}
+
+    def record(self, url: str, state: str, path: Optional[Path | str | List[Path]] = None, error: Optional[str | Exception] = None) -> None:
+        """
+        Record a state change, written with the next batch.
+
+        Args:
+            url: URL of the job
+            state: One of the state constants
+            path: Downloaded file, picker downloads are stored one path per line
+            error: Error that failed the job
+        """
+        if isinstance(path, list):
+            path = "\n".join(str(item) for item in path)
+        with self._lock:
+            self._pending[url] = (state, str(path) if path is not None else None, str(error) if error is not None else None, time())
+            due = len(self._pending) >= self.batch_size or time() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered updates in one transaction."""
+        with self._lock:
+            self._last_flush = time()
+            if not self._pending:
+                return
+            rows = [(url, *update) for url, update in self._pending.items()]
+            self._pending.clear()
+            with self._db:
+                self._db.executemany(
+                    "INSERT INTO jobs (url, state, path, error, updated_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(url) DO UPDATE SET state = excluded.state, path = COALESCE(excluded.path, jobs.path), "
+                    "error = excluded.error, updated_at = excluded.updated_at",
+                    rows,
+                )
+        logger.debug(f"Journal wrote {len(rows)} updates to {self.path}")
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of jobs in each state."""
+        self.flush()
+        with self._lock:
+            return dict(self._db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+    def close(self) -> None:
+        """Write buffered updates and close the database."""
+        self.flush()
+        with self._lock:
+            self._db.close()
@@ -3,12 +3,16 @@ import platform
 import subprocess
 import json
 from pathlib import Path
+import asyncio
+import copy
 import time
+from contextlib import contextmanager
 import yaml
 import click
-from typing import Dict, Optional, List, Any
+from aiohttp import ClientSession, ClientTimeout, ClientError
+from typing import Dict, Iterator, Optional, List, Any
 
-from .config import Config
+from .config import Config, get_config
 from .network import HttpClient
 
 
@@ -24,18 +28,25 @@ class LocalInstance:
     Provides functionality to install, start, stop, and configure the instance.
     """
 
-    def __init__(self, config: Config = None):
+    def __init__(self, config: Config = None, replica: int = 0):
         """
         Initialize the LocalInstance with configuration.
 
         Args:
-            config: Config instance to use. If None, a new one will be created.
+            config: Config instance to use. If None, the shared config is used.
+            replica: Index of the replica this object talks to, replica N listens on local_instance_port + N
         """
-        self.config = config or Config()
+        self.config = config or get_config()
+        self.replica = replica
+        # Requests and downloads currently in flight on this replica, used for least-outstanding-requests routing
+        self.outstanding = 0
         self.instance_dir = self._get_instance_dir()
         self.docker_compose_path = self.instance_dir / "docker-compose.yml"
         self.cookies_path = self.instance_dir / "cookies.json"
         self.api_key = None
+        self._healthy: Optional[bool] = None
+        self._health_checked_at = 0.0
+        self._health_task: Optional[asyncio.Task] = None
 
     @property
     def api_url(self) -> str:
@@ -45,8 +56,35 @@ class LocalInstance:
         Returns:
             The API URL as a string.
         """
-        port = self.config.get_as_number("local_instance_port", 8009, "local")
-        return f"http://localhost:{port}/"
+        return f"http://localhost:{self.port}/"
+
+    @property
+    def port(self) -> int:
+        """Port of this replica."""
+        return self.config.get_as_number("local_instance_port", 8009, "local") + self.replica
+
+    @property
+    def replicas(self) -> int:
+        """Number of replicas in the deployment."""
+        return max(int(self.config.get_as_number("replicas", 1, "local")), 1)
+
+    @staticmethod
+    def service_name(replica: int) -> str:
+        """Docker Compose service and container name of a replica, the first one keeps the plain cobalt-api name."""
+        return "cobalt-api" if replica == 0 else f"cobalt-api-{replica + 1}"
+
+    def get_replicas(self) -> List["LocalInstance"]:
+        """Return one LocalInstance per replica, starting with this one."""
+        return [self] + [LocalInstance(config=self.config, replica=replica) for replica in range(1, self.replicas)]
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """Count a request or download as outstanding on this replica while the block runs."""
+        self.outstanding += 1
+        try:
+            yield
+        finally:
+            self.outstanding -= 1
 
     def _get_instance_dir(self) -> Path:
         """Get the directory for the local instance files."""
@@ -269,6 +307,16 @@ To fix this issue:
         if proxy_url:
             compose_data["services"]["cobalt-api"]["environment"]["API_EXTERNAL_PROXY"] = proxy_url
 
+        # Replicas are copies of the first service on consecutive ports
+        for replica in range(1, self.replicas):
+            replica_port = port + replica
+            service = copy.deepcopy(compose_data["services"]["cobalt-api"])
+            service["container_name"] = self.service_name(replica)
+            service["ports"] = [f"{replica_port}:{replica_port}/tcp"]
+            service["environment"]["API_URL"] = f"http://localhost:{replica_port}/"
+            service["environment"]["API_PORT"] = replica_port
+            compose_data["services"][self.service_name(replica)] = service
+
         # Save the docker-compose.yml file
         with open(self.docker_compose_path, "w") as f:
             yaml.dump(compose_data, f, default_flow_style=False)
@@ -315,17 +363,21 @@ To fix this issue:
                 with open(self.docker_compose_path, "r") as f:
                     compose_data = yaml.safe_load(f)
 
-                # Add the cookie path environment variable
-                compose_data["services"]["cobalt-api"]["environment"]["COOKIE_PATH"] = "/cookies.json"
+                for name, service in compose_data["services"].items():
+                    if not name.startswith("cobalt-api"):
+                        continue
 
-                # Add the volume mount for the cookies.json file
-                if "volumes" not in compose_data["services"]["cobalt-api"]:
-                    compose_data["services"]["cobalt-api"]["volumes"] = []
+                    # Add the cookie path environment variable
+                    service["environment"]["COOKIE_PATH"] = "/cookies.json"
 
-                # Check if the mount already exists
-                cookie_mount = "./cookies.json:/cookies.json"
-                if cookie_mount not in compose_data["services"]["cobalt-api"]["volumes"]:
-                    compose_data["services"]["cobalt-api"]["volumes"].append(cookie_mount)
+                    # Add the volume mount for the cookies.json file
+                    if "volumes" not in service:
+                        service["volumes"] = []
+
+                    # Check if the mount already exists
+                    cookie_mount = "./cookies.json:/cookies.json"
+                    if cookie_mount not in service["volumes"]:
+                        service["volumes"].append(cookie_mount)
 
                 # Save the updated compose file
                 with open(self.docker_compose_path, "w") as f:
@@ -396,9 +448,64 @@ To fix this issue:
         time.sleep(3)  # Give it a moment to fully shut down
         return self.start_instance()
 
+    @property
+    def health_ttl(self) -> float:
+        """Seconds a health check result is reused before it's refreshed."""
+        return self.config.get_as_number("health_check_ttl", 10, "local")
+
+    async def check_health(self) -> bool:
+        """
+        Check if the local instance answers on its API URL and cache the result.
+
+        This is a single short HTTP GET, unlike get_instance_status which inspects the containers with docker.
+
+        Returns:
+            True if the instance responded
+        """
+        healthy = False
+        if os.path.exists(self.docker_compose_path):
+            try:
+                async with ClientSession(timeout=ClientTimeout(total=2)) as session:
+                    async with session.get(self.api_url) as response:
+                        healthy = response.status < 500
+            except (ClientError, asyncio.TimeoutError, OSError):
+                healthy = False
+        self._healthy, self._health_checked_at = healthy, time.monotonic()
+        return healthy
+
+    def _refresh_health_in_background(self) -> None:
+        """Start a health check in the running event loop unless one is already in flight."""
+        if self._health_task is not None and not self._health_task.done():
+            return
+        try:
+            self._health_task = asyncio.get_running_loop().create_task(self.check_health())
+        except RuntimeError:
+            # No event loop, the cached result is kept until the next async check
+            pass
+
+    async def is_healthy(self) -> bool:
+        """
+        Cached health of the local instance.
+
+        The first call waits for a check, later calls return the cached result right away and refresh it
+        in the background once it's older than health_ttl.
+        """
+        if self._healthy is None:
+            return await self.check_health()
+        return self.healthy
+
+    @property
+    def healthy(self) -> bool:
+        """Last known health of the local instance, refreshed in the background once it's older than health_ttl."""
+        if time.monotonic() - self._health_checked_at > self.health_ttl:
+            self._refresh_health_in_background()
+        return bool(self._healthy)
+
     def get_instance_status(self) -> Dict[str, Any]:
         """
-        Get the status of the local instance.
+        Get the status of the local instance from docker.
+
+        This runs docker compose subprocesses, use is_healthy for a cheap liveness check.
 
         Returns:
             Dict with status information
@@ -443,20 +550,27 @@ To fix this issue:
                     "raw_output": ps_result.stdout,
                 }
 
-            # Check if any container is the cobalt-api and is running
-            for container in containers:
-                if container.get("Name") == "cobalt-api" or container.get("Service") == "cobalt-api":
-                    state = container.get("State", "")
-                    if isinstance(state, str) and "running" in state.lower():
-                        return {"running": True, "container_info": container}
+            # Check which cobalt-api replicas are running
+            running = [
+                container
+                for container in containers
+                if str(container.get("Name") or container.get("Service") or "").startswith("cobalt-api")
+                and isinstance(container.get("State", ""), str)
+                and "running" in container.get("State", "").lower()
+            ]
+            if running:
+                return {"running": True, "container_info": running[0], "replicas_running": len(running)}
 
             return {"running": False, "containers": containers}
         except subprocess.SubprocessError as e:
             return {"running": False, "error": str(e)}
 
-    def setup_wizard(self) -> None:
+    def setup_wizard(self, replicas: Optional[int] = None) -> None:
         """
         Interactive setup wizard for the local instance.
+
+        Args:
+            replicas: Number of cobalt containers to run on consecutive ports, asked for if not given
         """
         click.echo("Setting up a local Cobalt instance...")
 
@@ -478,6 +592,9 @@ Please install Docker and Docker Compose before continuing:
 
         # Collect configuration
         port = click.prompt("Enter port number for the instance", default=9000, type=int)
+        if replicas is None:
+            replicas = click.prompt("Enter number of replicas, each one runs on the next port", default=self.replicas, type=int)
+        replicas = max(replicas, 1)
         api_auth = click.confirm("Enable API key authentication?", default=False)
         api_key = ""
         if api_auth:
@@ -502,6 +619,7 @@ Please install Docker and Docker Compose before continuing:
 
         # Save settings to config
         self.config.set("local_instance_port", str(port), "local")
+        self.config.set("replicas", str(replicas), "local")
         self.config.set("api_auth_required", "1" if api_auth else "0", "local")
         if api_key:
             self.config.set("api_key", api_key, "local")
@@ -558,7 +676,8 @@ Please install Docker and Docker Compose before continuing:
         if click.confirm("Start the instance now?", default=True):
             try:
                 self.start_instance()
-                click.echo(f"Local Cobalt instance started on http://localhost:{port}/")
+                replica_info = f" with {replicas} replicas on ports {port}-{port + replicas - 1}" if replicas > 1 else ""
+                click.echo(f"Local Cobalt instance started on http://localhost:{port}/{replica_info}")
                 click.echo(f"Configuration directory: {self.instance_dir}")
             except LocalInstanceError as e:
                 click.echo(f"Failed to start instance: {e}")
@@ -2,8 +2,9 @@ import logging
 import logging.handlers
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import Optional, TextIO
 import os
+import weakref
 
 try:
     import colorama
@@ -25,6 +26,10 @@ if not HAS_COLORAMA:
     Fore = DummyColors()
     Style = DummyColors()
 
+# Stream of the console handlers, None means stdout
+_console_stream: Optional[TextIO] = None
+_console_handlers = weakref.WeakSet()
+
 
 class ColoredFormatter(logging.Formatter):
     """Custom formatter adding colors to log levels"""
@@ -91,7 +96,8 @@ def setup_logger(
     # Only add handlers if it doesn't have any or force_console is True
     if not logger.handlers or force_console:
         # Create console handler
-        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler = logging.StreamHandler(_console_stream or sys.stdout)
+        _console_handlers.add(console_handler)
         console_handler.setLevel(logging.DEBUG if debug else level)
 
         # Create and set formatter
@@ -111,6 +117,21 @@ def setup_logger(
     return logger
 
 
+def set_console_stream(stream: Optional[TextIO]) -> None:
+    """
+    Send console log output of every pybalt logger, including ones created later, to another stream.
+
+    Used when stdout carries data, e.g. NDJSON results, so log lines can't end up between them.
+
+    Args:
+        stream: Stream to write to, None for stdout
+    """
+    global _console_stream
+    _console_stream = stream
+    for handler in list(_console_handlers):
+        handler.setStream(stream or sys.stdout)
+
+
 def _add_file_handler(logger: logging.Logger, config, debug: bool = False):
     """
     Add a rotating file handler to the logger.
@@ -189,9 +210,9 @@ def get_logger(name: str, debug: Optional[bool] = None, config=None) -> logging.
     # Import here to avoid circular imports
     if config is None:
         try:
-            from .config import Config
+            from .config import get_config
 
-            config = Config()
+            config = get_config()
         except ImportError:
             # Fallback if config import fails
             config = None
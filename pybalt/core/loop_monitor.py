@@ -0,0 +1,105 @@
+from pathlib import Path
+from time import perf_counter
+from typing import List, Optional
+import asyncio
+import sys
+import threading
+import traceback
+from .config import Config, get_config
+from .logging_utils import get_logger
+from . import metrics
+
+
+logger = get_logger(__name__)
+
+# Frames from these files are skipped when naming the culprit, they only show where the loop was running from
+_LOOP_INTERNALS = (str(Path(asyncio.__file__).parent), threading.__file__)
+_PACKAGE_DIR = str(Path(__file__).resolve().parent.parent)
+
+
+def _culprit(stack: List[traceback.FrameSummary]) -> str:
+    """Name the innermost pybalt frame of a stack, or the innermost frame if none is from pybalt."""
+    frames = [frame for frame in stack if not frame.filename.startswith(_LOOP_INTERNALS)] or stack
+    for frame in reversed(frames):
+        if frame.filename.startswith(_PACKAGE_DIR):
+            break
+    else:
+        frame = frames[-1]
+    return f"{frame.name} ({Path(frame.filename).name}:{frame.lineno})"
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop runs scheduled callbacks and names the code blocking it.
+
+    A task on the loop records a heartbeat every SAMPLE_INTERVAL. A watchdog thread captures the loop
+    thread's stack with sys._current_frames() once the heartbeat is older than the threshold, so the
+    blocking call is caught while it is still running.
+
+    Usage:
+        monitor = LoopLagMonitor()
+        monitor.start()
+        ...
+        monitor.stop()
+    """
+
+    SAMPLE_INTERVAL = 0.1
+
+    def __init__(self, config: Optional[Config] = None, threshold: Optional[float] = None):
+        self.config = config or get_config()
+        self.threshold = threshold if threshold is not None else self.config.get_as_number("loop_lag_threshold", 0.5, "misc")
+        self.max_lag = 0.0
+        self._heartbeat = perf_counter()
+        self._loop_thread_id: Optional[int] = None
+        self._stall_stack: Optional[List[traceback.FrameSummary]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> Optional[asyncio.Task]:
+        """Start monitoring the running event loop, does nothing if the threshold is 0."""
+        if self.threshold <= 0 or self._task is not None:
+            return self._task
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = perf_counter()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._sample())
+        self._thread = threading.Thread(target=self._watch, name="pybalt-loop-watchdog", daemon=True)
+        self._thread.start()
+        return self._task
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._thread = None
+
+    async def _sample(self) -> None:
+        while True:
+            scheduled = perf_counter() + self.SAMPLE_INTERVAL
+            await asyncio.sleep(self.SAMPLE_INTERVAL)
+            now = perf_counter()
+            self._heartbeat = now
+            lag = max(now - scheduled, 0.0)
+            metrics.loop_lag_seconds.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            stack, self._stall_stack = self._stall_stack, None
+            if lag >= self.threshold:
+                culprit = _culprit(stack) if stack else "unknown"
+                logger.warning(f"Event loop was blocked for {lag:.3f}s by {culprit}")
+
+    def _watch(self) -> None:
+        """Watchdog thread body, captures the loop thread's stack while a stall is in progress."""
+        while not self._stopped.wait(self.SAMPLE_INTERVAL):
+            heartbeat = self._heartbeat
+            if perf_counter() - heartbeat - self.SAMPLE_INTERVAL < self.threshold or self._stall_stack is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            self._stall_stack = stack
+            culprit = _culprit(stack)
+            metrics.loop_stalls.inc(culprit=culprit)
+            logger.debug(f"Event loop blocked for over {self.threshold}s by {culprit}:\n{''.join(traceback.format_list(stack))}")
@@ -24,7 +24,9 @@ import platform
 import re
 import subprocess
 from urllib.parse import urlparse
-from .config import Config
+from .config import Config, get_config
+from .remux import Remuxer, RemuxError
+from . import metrics, tracing
 import asyncio
 from collections import deque
 from .logging_utils import get_logger
@@ -33,7 +35,10 @@ import uuid
 
 
 logger = get_logger(__name__)
-tracker = get_tracker()
+
+# Matches all YouTube URL variations
+YOUTUBE_URL = re.compile(r"(?:https?:\/\/)?(?:www\.|m\.|music\.)?(?:youtube\.com|youtu\.be)(?:\/[^\s]*)?")
+YOUTUBE_PLAYLIST_ID = re.compile(r"[&?]list=([^&]+)")
 
 
 class Response:
@@ -109,6 +114,47 @@ class DownloadStatus:
         self.completed = False
 
 
+class DownloadTiming:
+    """Where the time went for a single download, summed over retries and picker items.
+
+    All durations are in seconds and throughput is in bytes per second.
+    """
+
+    def __init__(self):
+        self.instance_selection = 0.0
+        self.resolve: Dict[str, float] = {}
+        self.winner: Optional[str] = None
+        self.ttfb = 0.0
+        self.transfer = 0.0
+        self.downloaded_size = 0
+        self.peak_speed = 0.0
+        self.disk_write = 0.0
+        self.remux = 0.0
+        self.retries = 0
+
+    @property
+    def average_speed(self) -> float:
+        return self.downloaded_size / self.transfer if self.transfer > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "instance_selection": self.instance_selection,
+            "resolve": dict(self.resolve),
+            "winner": self.winner,
+            "ttfb": self.ttfb,
+            "transfer": self.transfer,
+            "downloaded_size": self.downloaded_size,
+            "average_speed": self.average_speed,
+            "peak_speed": self.peak_speed,
+            "disk_write": self.disk_write,
+            "remux": self.remux,
+            "retries": self.retries,
+        }
+
+    def __repr__(self):
+        return f"<DownloadTiming {self.as_dict()}>"
+
+
 class DownloadOptions(TypedDict, total=False):
     """Type definition for download options."""
 
@@ -126,6 +172,9 @@ class DownloadOptions(TypedDict, total=False):
     close: Optional[bool]
     retry_count: Optional[int]
     progressive_timeout: Optional[bool]
+    remux_stream: Optional[bool]
+    timing: Optional[DownloadTiming]
+    resume: Optional[bool]
 
 
 class HttpClient:
@@ -145,7 +194,7 @@ class HttpClient:
     ):
         """Initialize the HTTP client with configurable options."""
         # Initialize config if not provided
-        self.config = config or Config()
+        self.config = config or get_config()
 
         # Get settings from config
         default_timeout = self.config.get_as_number("timeout", 30, section="network")
@@ -160,6 +209,12 @@ class HttpClient:
         if default_user_agent and "User-Agent" not in self.headers:
             self.headers["User-Agent"] = default_user_agent
 
+        # Explicit arguments win over config values when the config is reloaded
+        self._explicit_timeout = timeout
+        self._explicit_proxy = proxy
+        self._config_user_agent = default_user_agent
+        self._system_proxy = None
+
         self.timeout = timeout if timeout is not None else default_timeout
         self.debug = debug if debug is not None else default_debug
         self.verify_proxy = verify_proxy
@@ -177,7 +232,7 @@ class HttpClient:
 
         # Detect system proxy if auto-detect is enabled and no proxy is provided
         if auto_detect_proxy and not self.proxy:
-            self.proxy = self._detect_system_proxy()
+            self.proxy = self._system_proxy = self._detect_system_proxy()
 
         # Set logger to debug level if debug is enabled
         logger.setLevel(logging.DEBUG)
@@ -194,6 +249,23 @@ class HttpClient:
         if self.proxy:
             logger.debug(f"Using proxy: {self.proxy}")
 
+    def apply_config(self, config: Config = None) -> None:
+        """
+        Re-read timeout, proxy and user agent from config.
+
+        The session and its connection pool are kept, requests already in flight finish with the old values.
+        """
+        config = config or self.config
+        timeout = self._explicit_timeout if self._explicit_timeout is not None else config.get_as_number("timeout", 30, section="network")
+        proxy = self._explicit_proxy if self._explicit_proxy is not None else config.get("proxy", section="network") or self._system_proxy
+        user_agent = config.get("user_agent", section="general")
+        headers = dict(self.headers)
+        if user_agent and headers.get("User-Agent", self._config_user_agent) == self._config_user_agent:
+            headers["User-Agent"] = user_agent
+
+        self.config, self.timeout, self.proxy, self.headers, self._config_user_agent = config, timeout, proxy, headers, user_agent
+        logger.debug(f"Applied config to HttpClient: timeout={timeout}, proxy={proxy}")
+
     def _detect_system_proxy(self) -> Optional[str]:
         """Detect system proxy settings including Hiddify, Outline, or environment variables."""
         detected_proxy = None
@@ -554,6 +626,8 @@ class HttpClient:
                     response_time = time() - request_start_time
                     response_obj.status = response.status
                     response_obj.headers = dict(response.headers)
+                    metrics.http_requests.inc(method=response_obj.method, status=response.status)
+                    metrics.http_request_seconds.observe(response_time, method=response_obj.method)
 
                     # Debug logging for response
                     logger.debug(f"Response: {response.status} ({response_time:.2f}s)")
@@ -568,6 +642,7 @@ class HttpClient:
                             )
                         )
                         logger.debug(f"Rate limited, retrying after {retry_delay}s")
+                        metrics.http_retries.inc(reason="rate_limited")
                         await sleep(retry_delay)
                         return await self.request(
                             url,
@@ -606,8 +681,11 @@ class HttpClient:
 
         except Exception as e:
             logger.debug(f"Request error: {str(e)}")
+            if not response_obj.status:
+                metrics.http_requests.inc(method=response_obj.method, status="error")
             if retries < max_retries:
                 logger.debug(f"Retrying request ({retries + 1}/{max_retries})")
+                metrics.http_retries.inc(reason="error")
                 await sleep(self.config.get_as_number("retry_delay", 1.0, section="network"))
                 return await self.request(
                     url,
@@ -740,6 +818,7 @@ class HttpClient:
         tasks = []
 
         first_only = kwargs.pop("first_successful_only", False)
+        timing = kwargs.pop("timing", None)
 
         try:
             # Ensure session exists but don't close it in the request method
@@ -774,17 +853,28 @@ class HttpClient:
                         request_kwargs["headers"] = request_headers
 
                     # Don't close the session in individual requests
-                    response = await self.request(url, method=method, close=False, **request_kwargs)
+                    request_start_time = time()
+                    with tracing.span("instance_request", "resolve", instance=url, method=method) as span:
+                        response = await self.request(url, method=method, close=False, **request_kwargs)
+                        span["status"] = response.status
+                    instance = urlparse(url).netloc
+                    resolve_time = time() - request_start_time
+                    metrics.instance_resolve_seconds.observe(resolve_time, instance=instance)
+                    if timing is not None:
+                        timing.resolve[instance] = resolve_time
 
                     # Consider 2xx and 3xx status codes as successful
                     if response.status < 400:
                         logger.debug(f"Request to {url} succeeded with status {response.status}")
+                        metrics.instance_resolves.inc(instance=instance, status="ok")
                         return True, response
                     else:
                         logger.debug(f"Request to {url} failed with status {response.status}")
+                        metrics.instance_resolves.inc(instance=instance, status="failed")
                         return False, response
                 except Exception as e:
                     logger.debug(f"Request to {url} failed with error: {str(e)}")
+                    metrics.instance_resolves.inc(instance=urlparse(url).netloc, status="error")
                     # Create an error response
                     return False, Response(status=0, text=f"Error: {str(e)}")
 
@@ -1081,6 +1171,7 @@ class HttpClient:
 
         # Generate download ID for tracking
         download_id = str(uuid.uuid4())
+        tracker = get_tracker()
 
         # Get API key and bearer token if provided
         api_key = options.get("api_key")
@@ -1115,6 +1206,7 @@ class HttpClient:
             self.config.get_as_number("callback_rate", 0.128, section="network"),
         )
         max_speed = options.get("max_speed")
+        timing = options.get("timing")
         request_headers = options.get("headers", self.headers)
         # Determine if proxy should be used based on URL (bypass for localhost)
         request_proxy = self._get_effective_proxy(url, options.get("proxy"))
@@ -1145,9 +1237,17 @@ class HttpClient:
         last_callback_time = start_time
         last_size = 0
         iteration = 0
+        peak_speed = 0
+
+        # Continue a partial file from an interrupted run, only possible when the filename is known up front
+        partial_path = None
+        if options.get("resume") and options.get("filename") and not options.get("remux_stream"):
+            partial_path = path.join(folder_path, options["filename"])
+        resumed_size = 0
 
         # Prepare session (reuse session for better performance)
         session = await self._ensure_session(request_headers)
+        metrics.downloads_active.inc()
 
         try:
             # Set up SSL verification
@@ -1168,22 +1268,50 @@ class HttpClient:
             for retry_attempt in range(retry_count + 1):
                 if retry_attempt > 0:
                     logger.debug(f"Retry attempt {retry_attempt}/{retry_count} for download: {url}")
+                    if timing is not None:
+                        timing.retries += 1
                     await sleep(self.config.get_as_number("retry_delay", 1.0, section="network") * retry_attempt)
 
                 try:
-                    async with session.get(url, **download_kwargs) as response:
-                        if response.status >= 400:
+                    # Resume from what is on disk right now, earlier attempts of this call may have added to the partial file
+                    resume_from = path.getsize(partial_path) if partial_path and path.isfile(partial_path) else 0
+                    timed_out = False
+                    request_time = time()
+                    request_kwargs = download_kwargs
+                    if resume_from:
+                        request_kwargs = {**download_kwargs, "headers": {"Range": f"bytes={resume_from}-"}}
+                    async with session.get(url, **request_kwargs) as response:
+                        transfer_start = time()
+                        if timing is not None:
+                            timing.ttfb += transfer_start - request_time
+                        # The partial file already holds the whole file, e.g. the run stopped before the journal said done
+                        complete = (
+                            response.status == 416 and resume_from > 0 and response.headers.get("Content-Range") == f"bytes */{resume_from}"
+                        )
+                        if response.status >= 400 and not complete:
                             error_msg = f"Failed to download file, status code: {response.status}"
                             logger.debug(error_msg)
 
                             # Only retry on certain error codes
                             if response.status in (429, 500, 502, 503, 504) and retry_attempt < retry_count:
+                                metrics.http_retries.inc(reason="download_status")
                                 continue
                             raise Exception(error_msg)
 
                         total_size = int(response.headers.get("Content-Length", -1))
                         logger.debug(f"Content-Length: {total_size} bytes")
 
+                        # Servers that ignore the Range header send the whole file, which then replaces the partial one
+                        resumed_size = resume_from if resume_from and response.status in (206, 416) else 0
+                        if complete:
+                            logger.debug(f"Partial file is already complete at {resumed_size} bytes")
+                            total_size = resumed_size
+                        elif resumed_size:
+                            logger.debug(f"Resuming download at {resumed_size} bytes")
+                            if total_size != -1:
+                                total_size += resumed_size
+                        downloaded_size = last_size = resumed_size
+
                         # If progressive timeout is enabled, adjust timeout based on file size
                         if progressive_timeout and total_size > 0:
                             # Calculate appropriate timeout: base + size factor
@@ -1208,18 +1336,27 @@ class HttpClient:
                         file_path = path.join(folder_path, filename)
                         logger.debug(f"Downloading to: {file_path}")
 
-                        # Add download to tracker - ensure tracker is initialized
-                        if tracker.enabled:
-                            tracker.add_download(download_id, url, filename)
-                            tracker.update_download(download_id, total_size=total_size, file_path=file_path)
+                        # Add download to tracker, the handle is updated directly from the loop below
+                        progress = tracker.add_download(download_id, url, filename)
+                        if progress is not None:
+                            progress.total_size = total_size
+                            progress.file_path = file_path
 
                         # Download the file with optimized buffer handling
                         buffer_size = self.config.get_as_number("download_buffer_size", 20971520, "network")
                         logger.debug(f"Using buffer size: {buffer_size / 1024:.0f}KB")
 
-                        async with aopen(file_path, "wb") as f:
+                        # Pipe the body straight into ffmpeg if the container can be remuxed without seeking
+                        if options.get("remux_stream", False) and Remuxer.can_stream(filename):
+                            logger.debug("Remuxing while downloading")
+                            sink = Remuxer(config=self.config).stream(file_path)
+                        else:
+                            sink = aopen(file_path, "ab" if resumed_size else "wb")
+
+                        write_time = 0
+                        async with sink as f:
                             logger.debug("Download started")
-                            while True:
+                            while total_size == -1 or downloaded_size < total_size:
                                 try:
                                     # Use read() with a timeout to prevent hanging
                                     chunk = await asyncio.wait_for(
@@ -1232,12 +1369,16 @@ class HttpClient:
                                         break
 
                                     # Write chunk to file
-                                    await f.write(chunk)
+                                    write_start = time()
+                                    with tracing.span("write", "io", bytes=len(chunk)):
+                                        await f.write(chunk)
+                                    write_time += time() - write_start
                                     chunk_size = len(chunk)
                                     downloaded_size += chunk_size
 
                                     # Update download tracker
-                                    tracker.update_download(download_id, downloaded_size=downloaded_size)
+                                    if progress is not None:
+                                        progress.downloaded_size = downloaded_size
 
                                     # Update progress if needed (reduce time() calls)
                                     current_time = time()
@@ -1249,6 +1390,7 @@ class HttpClient:
                                             download_speed = (downloaded_size - last_size) / time_since_callback
                                         else:
                                             download_speed = 0
+                                        peak_speed = max(peak_speed, download_speed)
 
                                         eta = (
                                             (total_size - downloaded_size) / download_speed if download_speed > 0 and total_size > 0 else 0
@@ -1277,12 +1419,9 @@ class HttpClient:
                                         }
 
                                         # Update tracker with download speed and ETA
-                                        if tracker.enabled:
-                                            tracker.update_download(
-                                                download_id,
-                                                speed=download_speed,
-                                                eta=eta if eta else 0,
-                                            )
+                                        if progress is not None:
+                                            progress.speed = download_speed
+                                            progress.eta = eta if eta else 0
 
                                         # Process callbacks and status updates
                                         await self._process_download_callbacks(
@@ -1320,12 +1459,17 @@ class HttpClient:
 
                                     # Otherwise, retry the whole download
                                     if retry_attempt < retry_count:
+                                        timed_out = True
                                         break  # Break out of chunk reading loop to retry full download
                                     else:
                                         raise Exception(
                                             f"Download timed out after multiple retries ({downloaded_size / 1024 / 1024:.2f}MB downloaded)"
                                         )
 
+                    if timed_out:
+                        metrics.http_retries.inc(reason="download_timeout")
+                        continue
+
                     # If we reached here, the download was successful
                     # Verify download size
                     if downloaded_size <= 1024 and retry_attempt < retry_count:
@@ -1333,6 +1477,14 @@ class HttpClient:
                         logger.debug(f"Downloaded file is too small ({downloaded_size} bytes), retrying...")
                         continue
 
+                    if timing is not None:
+                        transfer_time = time() - transfer_start
+                        timing.transfer += transfer_time
+                        timing.downloaded_size += downloaded_size - resumed_size
+                        timing.disk_write += write_time
+                        # Downloads shorter than callback_rate never measure a speed sample
+                        timing.peak_speed = max(timing.peak_speed, peak_speed or (downloaded_size - resumed_size) / (transfer_time or 1))
+
                     # Process completion
                     if status_parent or done_callback:
                         completion_time = time()
@@ -1367,6 +1519,8 @@ class HttpClient:
                                 "filename": filename,
                                 "total_size": path.getsize(file_path),
                             }
+                            if timing is not None:
+                                done_data["timing"] = timing
 
                             logger.debug(f"Calling done callback with data: {done_data}")
 
@@ -1378,14 +1532,20 @@ class HttpClient:
                     # Mark download as complete in tracker
                     if tracker.enabled:
                         tracker.complete_download(download_id, file_path)
+                    metrics.downloads.inc(status="done")
+                    metrics.download_seconds.observe(time() - start_time)
 
                     # If successful, break out of the retry loop
                     break
 
+                except RemuxError:
+                    # ffmpeg would reject the same input again, the caller falls back to remuxing from disk
+                    raise
                 except (asyncio.TimeoutError, ConnectionError) as e:
                     # Only retry on timeouts and connection errors
                     if retry_attempt < retry_count:
                         logger.debug(f"Download error (attempt {retry_attempt + 1}/{retry_count + 1}): {str(e)}")
+                        metrics.http_retries.inc(reason="download_error")
                     else:
                         # Last attempt failed, remove from tracker and re-raise
                         if tracker.enabled:
@@ -1397,9 +1557,12 @@ class HttpClient:
             # Remove failed download from tracker
             if tracker.enabled:
                 tracker.remove_download(download_id)
+            metrics.downloads.inc(status="failed")
             logger.debug(f"Download error: {str(e)}")
             raise
         finally:
+            metrics.downloads_active.dec()
+            metrics.download_bytes.inc(downloaded_size - resumed_size)
             if should_close:
                 logger.debug("Closing session")
                 await session.close()
@@ -1460,28 +1623,26 @@ class HttpClient:
 
         return download_task
 
+    @staticmethod
+    def is_playlist(url: str) -> bool:
+        """Check if a link is a playlist, without any network requests"""
+        # A video link with a playlist ID is just the video
+        return bool(YOUTUBE_URL.match(url)) and "?v=" not in url and YOUTUBE_PLAYLIST_ID.search(url) is not None
+
     def detect_playlist(self, url: str) -> List[str]:
         """
-        Checks wherever a link is a playlist and if so, returns a url list of an playlist members
+        Checks wherever a link is a playlist and if so, returns a url list of an playlist members.
+        Fetching the playlist blocks, run it in a thread when called from the event loop.
 
         Returns:
             List[str] or None: List of URLs if a playlist is detected, otherwise list with the original URL
         """
         # YouTube playlist
-        # Define a regex pattern to match all YouTube URL variations
-        youtube_pattern = r"(?:https?:\/\/)?(?:www\.|m\.|music\.)?(?:youtube\.com|youtu\.be)(?:\/[^\s]*)?"
-
-        # Check if the URL is a YouTube link
-        if re.match(youtube_pattern, url):
+        if YOUTUBE_URL.match(url):
             logger.debug(f"Detected YouTube URL: {url}")
             # Check if it's a playlist
-            playlist_id_match = re.findall(r"[&?]list=([^&]+)", url)
-            if playlist_id_match:
-                # Check if this is just a video link with a playlist ID
-                if "?v=" in url:
-                    return [url]
-
-                logger.debug(f"Detected YouTube playlist ID: {playlist_id_match[0]}")
+            if self.is_playlist(url):
+                logger.debug(f"Detected YouTube playlist ID: {YOUTUBE_PLAYLIST_ID.search(url).group(1)}")
                 try:
                     from pytube import Playlist
 
@@ -0,0 +1,97 @@
+from pathlib import Path
+from typing import Dict, List, Tuple
+import cProfile
+import inspect
+import io
+import pstats
+import sys
+
+
+_PACKAGE_DIR = str(Path(__file__).resolve().parent.parent)
+
+
+def _pybalt_owners() -> Dict[Tuple[str, int], str]:
+    """Map (filename, first line) of every function defined in a loaded pybalt class to the class name."""
+    owners = {}
+    for name, module in list(sys.modules.items()):
+        if not name.startswith("pybalt") or module is None:
+            continue
+        for cls in vars(module).values():
+            if not inspect.isclass(cls) or cls.__module__ != name:
+                continue
+            for attribute in vars(cls).values():
+                function = attribute.fget if isinstance(attribute, property) else getattr(attribute, "__func__", attribute)
+                code = getattr(function, "__code__", None)
+                if code is not None:
+                    owners[(code.co_filename, code.co_firstlineno)] = cls.__name__
+    return owners
+
+
+class Profiler:
+    """
+    Deterministic profiler for a whole CLI or API server run, built on cProfile.
+
+    Usage:
+        profiler = Profiler()
+        profiler.start()
+        ...
+        profiler.stop()
+        profiler.write("out.prof")
+    """
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self) -> None:
+        self.profile.enable()
+
+    def stop(self) -> None:
+        self.profile.disable()
+
+    def summary(self, limit: int = 15) -> str:
+        """
+        Short report of where the time went.
+
+        Own time of pybalt functions is grouped by the class they belong to (HttpClient, InstanceManager,
+        Tracker, Config, ...) or by module for plain functions, followed by the hottest functions overall.
+        """
+        stats = pstats.Stats(self.profile)
+        owners = _pybalt_owners()
+        groups: Dict[str, float] = {}
+        functions: List[Tuple[float, float, int, str]] = []
+        for (filename, lineno, name), (_, calls, own_time, total_time, _) in stats.stats.items():
+            if filename.startswith(_PACKAGE_DIR):
+                module = Path(filename).relative_to(_PACKAGE_DIR).with_suffix("").as_posix().replace("/", ".")
+                owner = owners.get((filename, lineno))
+                group = owner or f"pybalt.{module}"
+                groups[group] = groups.get(group, 0.0) + own_time
+                label = f"{owner}.{name}" if owner else f"pybalt.{module}.{name}"
+            else:
+                label = f"{name} ({Path(filename).name}:{lineno})" if lineno else name
+            functions.append((own_time, total_time, calls, label))
+
+        total = stats.total_tt or 1.0
+        lines = [f"Profiled {stats.total_tt:.3f}s, pybalt own time by class:"]
+        for group, own_time in sorted(groups.items(), key=lambda item: item[1], reverse=True)[:limit]:
+            lines.append(f"  {group:<40} {own_time:>9.3f}s {own_time / total:>6.1%}")
+        lines.append(f"Top {limit} functions by own time:")
+        lines.append(f"  {'own':>9} {'total':>9} {'calls':>9}  function")
+        for own_time, total_time, calls, label in sorted(functions, reverse=True)[:limit]:
+            lines.append(f"  {own_time:>8.3f}s {total_time:>8.3f}s {calls:>9}  {label}")
+        return "\n".join(lines)
+
+    def write(self, path: Path | str, limit: int = 15) -> str:
+        """
+        Write the raw profile to path, readable with pstats or snakeviz, and the summary next to it as path.txt.
+
+        Returns:
+            The summary text
+        """
+        path = Path(path)
+        self.profile.dump_stats(str(path))
+        summary = self.summary(limit)
+        report = io.StringIO()
+        pstats.Stats(self.profile, stream=report).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(40)
+        path.with_name(f"{path.name}.txt").write_text(f"{summary}\n\n{report.getvalue()}", encoding="utf-8")
+        return summary
+
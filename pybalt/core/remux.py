@@ -1,90 +1,657 @@
 from pathlib import Path
-from time import time, sleep
-from .config import Config
-from subprocess import Popen
+from time import time
+from .config import Config, get_config
+from asyncio import iscoroutinefunction
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple, Union
+import asyncio
+import json
 import os
+import shutil
+import subprocess
 from .logging_utils import get_logger
+from . import metrics
 
 logger = get_logger(__name__)
 
+# Containers ffmpeg can demux from a non-seekable pipe
+STREAMABLE_EXTENSIONS = {".webm", ".mkv", ".mka", ".ts", ".mp3", ".ogg", ".opus", ".wav", ".flv", ".aac"}
+
+# remux_args options that apply to the input, everything else is passed as an output option
+INPUT_OPTIONS = {"-hwaccel", "-hwaccel_device", "-hwaccel_output_format", "-init_hw_device"}
+
+# Part of the ffprobe format_name expected for each extension, a mismatch means the container is mislabeled
+CONTAINER_FORMATS = {
+    ".mp4": "mp4",
+    ".m4a": "mp4",
+    ".mov": "mov",
+    ".webm": "webm",
+    ".mkv": "matroska",
+    ".mka": "matroska",
+    ".mp3": "mp3",
+    ".ogg": "ogg",
+    ".opus": "ogg",
+    ".wav": "wav",
+}
+
+# Boxes only written by fragmented mp4 files, which most players can't seek in. ffmpeg's frag_keyframe output,
+# what cobalt tunnels serve, keeps the plain isom brand, so fragmentation is read from the boxes themselves
+FRAGMENT_BOXES = {b"moof", b"mvex", b"mfra", b"sidx"}
+
+# Extensions picked up when remuxing a whole directory tree
+MEDIA_EXTENSIONS = {".mp4", ".m4a", ".mov", ".webm", ".mkv", ".mka", ".mp3", ".ogg", ".opus", ".wav", ".flv", ".ts", ".aac"}
+
+# Name of the index remux_tree keeps in the root directory
+INDEX_FILENAME = ".pybalt_remux_index"
+
+# ffprobe results keyed by (path, size, mtime), so unchanged files are only probed once
+PROBE_CACHE_SIZE = 1024
+_probe_cache: "OrderedDict[Tuple[str, int, int], Optional[Dict[str, Any]]]" = OrderedDict()
+
+
+@lru_cache(maxsize=None)
+def ffmpeg_capabilities() -> Dict[str, Any]:
+    """
+    Probe the installed ffmpeg once per process.
+
+    Returns:
+        Dict with "ffmpeg" and "ffprobe" availability flags and the set of supported "hwaccels"
+    """
+    capabilities = {
+        "ffmpeg": shutil.which("ffmpeg") is not None,
+        "ffprobe": shutil.which("ffprobe") is not None,
+        "hwaccels": set(),
+    }
+    if capabilities["ffmpeg"]:
+        try:
+            result = subprocess.run(["ffmpeg", "-hide_banner", "-hwaccels"], capture_output=True, text=True, timeout=10)
+            # First line is the "Hardware acceleration methods:" header
+            capabilities["hwaccels"] = {line.strip() for line in result.stdout.splitlines()[1:] if line.strip()}
+        except (subprocess.SubprocessError, OSError) as e:
+            logger.debug(f"Failed to probe ffmpeg hwaccels: {e}")
+    logger.debug(f"ffmpeg capabilities: {capabilities}")
+    return capabilities
+
+
+class RemuxError(Exception):
+    """Exception raised when ffmpeg fails to remux a file."""
+
+    pass
+
 
 class Remuxer:
     def __init__(self, debug: bool = None, config: Config = None):
-        self.config = config if config else Config()
+        self.config = config if config else get_config()
         self.debug = debug if debug else self.config.get("debug", False, "general")
         if self.debug:
             global logger
             logger = get_logger(__name__, debug=True)
 
-    def remux(self, path: Path | str, keep_original: bool = None) -> Path:
+    def _build_command(self, source: Path | str, output: Path) -> List[str]:
+        """
+        Build the ffmpeg command line for remuxing source into output.
+
+        Progress is reported as key=value blocks on stdout (-progress pipe:1), so it can be parsed
+        incrementally instead of polling a log file. A source of "pipe:0" reads the input from stdin.
+        """
+        input_args, output_args = self._split_remux_args()
+        return [
+            "ffmpeg",
+            *(["-nostdin"] if str(source) != "pipe:0" else []),
+            "-y",
+            *input_args,
+            "-i",
+            str(source),
+            "-c",
+            "copy",
+            *output_args,
+            "-progress",
+            "pipe:1",
+            "-nostats",
+            "-loglevel",
+            "error",
+            str(output),
+        ]
+
+    def _split_remux_args(self) -> Tuple[List[str], List[str]]:
+        """
+        Split remux_args into input and output options, dropping hwaccels the installed ffmpeg doesn't support.
+
+        Returns:
+            Tuple of (input_args, output_args)
+        """
+        args = str(self.config.get("remux_args", "-hwaccel opencl", "ffmpeg") or "").split()
+        hwaccels = ffmpeg_capabilities()["hwaccels"]
+        input_args, output_args = [], []
+        i = 0
+        while i < len(args):
+            option = args[i]
+            has_value = i + 1 < len(args) and not args[i + 1].startswith("-")
+            group = args[i : i + 2] if has_value else args[i : i + 1]
+            i += len(group)
+            if option not in INPUT_OPTIONS:
+                output_args += group
+            elif option == "-hwaccel" and has_value and group[1] != "auto" and group[1] not in hwaccels:
+                logger.debug(f"Skipping unsupported hwaccel {group[1]}")
+            else:
+                input_args += group
+        return input_args, output_args
+
+    def _probe_command(self, path: Path) -> List[str]:
+        return ["ffprobe", "-v", "error", "-print_format", "json", "-show_format", "-show_streams", str(path)]
+
+    @staticmethod
+    def _probe_key(path: Path) -> Tuple[str, int, int]:
+        stat = path.stat()
+        return str(path.resolve()), stat.st_size, stat.st_mtime_ns
+
+    @staticmethod
+    def _remember_probe(key: Tuple[str, int, int], info: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        _probe_cache[key] = info
+        _probe_cache.move_to_end(key)
+        while len(_probe_cache) > PROBE_CACHE_SIZE:
+            _probe_cache.popitem(last=False)
+        return info
+
+    def probe(self, path: Path | str) -> Optional[Dict[str, Any]]:
+        """
+        Get ffprobe format and stream information for a file, cached by size and mtime.
+
+        Returns:
+            Parsed ffprobe output, or None if ffprobe is unavailable or failed
+        """
+        path = Path(path)
+        key = self._probe_key(path)
+        if key in _probe_cache:
+            return _probe_cache[key]
+        if not ffmpeg_capabilities()["ffprobe"]:
+            return None
+        try:
+            result = subprocess.run(self._probe_command(path), capture_output=True, timeout=30)
+            info = json.loads(result.stdout) if result.returncode == 0 else None
+        except (subprocess.SubprocessError, OSError, ValueError) as e:
+            logger.debug(f"Failed to probe {path.name}: {e}")
+            info = None
+        return self._remember_probe(key, info)
+
+    async def probe_async(self, path: Path | str) -> Optional[Dict[str, Any]]:
+        """Same as probe, without blocking the event loop."""
+        path = Path(path)
+        key = self._probe_key(path)
+        if key in _probe_cache:
+            return _probe_cache[key]
+        if not (await asyncio.to_thread(ffmpeg_capabilities))["ffprobe"]:
+            return None
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *self._probe_command(path),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+                stdin=asyncio.subprocess.DEVNULL,
+            )
+            stdout, _ = await asyncio.wait_for(process.communicate(), timeout=30)
+            info = json.loads(stdout) if process.returncode == 0 else None
+        except (asyncio.TimeoutError, OSError, ValueError) as e:
+            logger.debug(f"Failed to probe {path.name}: {e}")
+            info = None
+        return self._remember_probe(key, info)
+
+    @staticmethod
+    def needs_remux(path: Path | str, info: Optional[Dict[str, Any]]) -> bool:
+        """
+        Decide from ffprobe output whether a stream copy would change anything.
+
+        A file is considered clean when ffprobe knows its duration, the container matches the
+        extension and, for mp4, it has no fragment boxes. Anything that can't be verified is remuxed.
+        """
+        if not info or not info.get("streams"):
+            return True
+        format_info = info.get("format", {})
+        if format_info.get("duration") in (None, "", "N/A"):
+            return True
+        format_name = format_info.get("format_name", "")
+        expected = CONTAINER_FORMATS.get(Path(path).suffix.lower())
+        if expected and expected not in format_name:
+            return True
+        if "mp4" in format_name and Remuxer.is_fragmented(path):
+            return True
+        return False
+
+    @staticmethod
+    def is_fragmented(path: Path | str) -> bool:
+        """
+        Check the top level mp4 boxes, and the boxes inside moov, for any that only fragmented files have.
+
+        Only box headers are read, so this takes a few small reads even for large files. Files that can't
+        be read or parsed count as fragmented, so they are remuxed.
+        """
+
+        def boxes(f, start: int, end: int):
+            position = start
+            while position + 8 <= end:
+                f.seek(position)
+                header = f.read(8)
+                if len(header) < 8:
+                    return
+                size, box_type = int.from_bytes(header[:4], "big"), header[4:]
+                header_size = 8
+                if size == 1:
+                    size, header_size = int.from_bytes(f.read(8), "big"), 16
+                elif size == 0:
+                    size = end - position
+                if size < header_size:
+                    raise ValueError(f"Invalid {box_type!r} box size {size}")
+                yield box_type, position + header_size, position + size
+                position += size
+
+        try:
+            with open(path, "rb") as f:
+                end = f.seek(0, os.SEEK_END)
+                for box_type, body, box_end in boxes(f, 0, end):
+                    if box_type in FRAGMENT_BOXES:
+                        return True
+                    if box_type == b"moov":
+                        if any(child in FRAGMENT_BOXES for child, _, _ in boxes(f, body, min(box_end, end))):
+                            return True
+        except (OSError, ValueError) as e:
+            logger.debug(f"Failed to read the boxes of {Path(path).name}: {e}")
+            return True
+        return False
+
+    @staticmethod
+    def _parse_progress_line(line: Union[str, bytes], data: Dict[str, str]) -> bool:
+        """
+        Parse a single line of ffmpeg -progress output into data.
+
+        Returns:
+            True if the line closes a progress block (progress=continue or progress=end)
+        """
+        if isinstance(line, bytes):
+            line = line.decode(errors="ignore")
+        key, separator, value = line.strip().partition("=")
+        if not separator:
+            return False
+        data[key] = value
+        return key == "progress"
+
+    def _prepare(self, path: Path | str) -> tuple[Path, Path]:
+        """Resolve the input path and clear any stale output file."""
         if isinstance(path, str):
             path = Path(path)
-        if keep_original is None:
-            keep_original = self.config.get("keep_original", True, "ffmpeg")
-        start_time = time()
         output = path.with_name(f"rmx_{path.name}")
-        progress_file = (
-            self.config._get_config_dir() / "logs" / f"{path.name if len(path.name) <= 20 else path.name[:8] + '...' + path.name[-8:]}.log"
-        )
-        if progress_file.exists():
-            progress_file.unlink()
-        os.makedirs(progress_file.parent.resolve(), exist_ok=True)
         if output.exists():
             output.unlink()
+        return path, output
+
+    def _finalize(self, path: Path, output: Path, keep_original: bool, start_time: float) -> Path:
+        """Replace the original file with the remuxed one unless it should be kept."""
+        if not keep_original:
+            path.unlink()
+            output = output.rename(path)
+        logger.debug(
+            f"Remux result: {output} {output.stat().st_size / 1024 / 1024:.2f}MB {time() - start_time:.2f}s",
+        )
+        metrics.remux_seconds.observe(time() - start_time)
+        metrics.remuxes.inc(status="done")
+        return output
+
+    def remux(self, path: Path | str, keep_original: bool = None, force: bool = False) -> Path:
+        """
+        Remux a file synchronously, blocking until ffmpeg exits.
+
+        Prefer remux_async when running inside an event loop.
+
+        Args:
+            path: Path to the file to remux
+            keep_original: Keep the original file and return the rmx_ copy
+            force: Remux even if ffprobe says the file is already clean
+
+        Returns:
+            Path to the remuxed file, or the original path if remuxing was skipped or failed
+        """
+        path, output = self._prepare(path)
+        if keep_original is None:
+            keep_original = self.config.get("keep_original", True, "ffmpeg")
+        if not force and self.config.get("skip_clean_remux", True, "ffmpeg") and not self.needs_remux(path, self.probe(path)):
+            logger.debug(f"Skipping remux of {path.name}, container is already clean")
+            metrics.remuxes.inc(status="skipped")
+            return path
+        start_time = time()
         logger.debug(f"Remuxing {path.name}")
         try:
-            Popen(
-                [
-                    "ffmpeg",
-                    "-i",
-                    str(path),
-                    "-c",
-                    "copy",
-                    str(output),
-                    "-progress",
-                    str(progress_file),
-                    "-loglevel",
-                    "error",
-                ]
-                + self.config.get("remux_args", "-hwaccel opencl", "ffmpeg").split(" ")
-                if self.config.get("remux_args", "-hwaccel opencl", "ffmpeg") != ""
-                else [],
-                stdout=None,
-                stderr=None,
-                stdin=None,
+            process = subprocess.Popen(
+                self._build_command(path, output),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                stdin=subprocess.DEVNULL,
             )
-            last_update = 0
             data = {}
-            while True:
-                sleep(0.5)
-                if progress_file.exists() and time() - 0.5 > last_update:
-                    last_update = time()
-                    text = progress_file.read_text()
-                    lines_reversed = text.splitlines()[::-1]
-                    updated = []
-                    for line in lines_reversed:
-                        key, value = line.split("=")
-                        if key in updated:
-                            break
-                        updated += [key]
-                        data.update({key: value})
-                if data.get("progress", "") == "end":
-                    break
-                logger.debug(
-                    f"Remuxing status: {data.get('progress', 'unknown')} speed: {data.get('speed', '0.00x')} {data.get('fps', '0.00')}fps frame {data.get('frame', '0')}",
-                )
+            for line in process.stdout:
+                if self._parse_progress_line(line, data):
+                    logger.debug(
+                        f"Remuxing status: {data.get('progress', 'unknown')} speed: {data.get('speed', '0.00x')} {data.get('fps', '0.00')}fps frame {data.get('frame', '0')}",
+                    )
+            stderr = process.stderr.read().decode(errors="ignore").strip()
+            if process.wait() != 0:
+                raise RemuxError(f"ffmpeg exited with code {process.returncode}: {stderr}")
         except Exception as e:
             logger.debug(f":Remuxing {path.name} to {output} failed: {e}")
+            metrics.remuxes.inc(status="failed")
+            if output.exists():
+                output.unlink()
             return path
-        if progress_file.exists():
-            progress_file.unlink()
-        if not keep_original:
-            path.unlink()
-            output = output.rename(path)
-        logger.debug(
-            f"Remux result: {output} {output.stat().st_size / 1024 / 1024:.2f}MB {time() - start_time:.2f}s",
+        return self._finalize(path, output, keep_original, start_time)
+
+    async def remux_async(
+        self,
+        path: Path | str,
+        keep_original: bool = None,
+        timeout: Optional[float] = None,
+        progress_callback: Optional[Union[Callable, Coroutine]] = None,
+        force: bool = False,
+    ) -> Path:
+        """
+        Remux a file without blocking the event loop.
+
+        Args:
+            path: Path to the file to remux
+            keep_original: Keep the original file and return the rmx_ copy
+            timeout: Maximum time in seconds to let ffmpeg run, 0 or None for no limit
+            progress_callback: Called with the parsed ffmpeg progress fields after every progress block
+            force: Remux even if ffprobe says the file is already clean
+
+        Returns:
+            Path to the remuxed file, or the original path if remuxing was skipped
+
+        Raises:
+            RemuxError: If ffmpeg can't be started, exits with a non-zero code or times out
+        """
+        path, output = self._prepare(path)
+        if keep_original is None:
+            keep_original = self.config.get("keep_original", True, "ffmpeg")
+        if timeout is None:
+            timeout = self.config.get_as_number("remux_timeout", 0, "ffmpeg")
+        if not force and self.config.get("skip_clean_remux", True, "ffmpeg"):
+            if not self.needs_remux(path, await self.probe_async(path)):
+                logger.debug(f"Skipping remux of {path.name}, container is already clean")
+                metrics.remuxes.inc(status="skipped")
+                return path
+        start_time = time()
+        logger.debug(f"Remuxing {path.name}")
+
+        # Capabilities are probed once, off the event loop
+        await asyncio.to_thread(ffmpeg_capabilities)
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *self._build_command(path, output),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                stdin=asyncio.subprocess.DEVNULL,
+            )
+        except OSError as e:
+            metrics.remuxes.inc(status="failed")
+            raise RemuxError(f"Failed to start ffmpeg: {e}") from e
+
+        async def run():
+            _, stderr = await asyncio.gather(self._read_progress(process.stdout, progress_callback), process.stderr.read())
+            return await process.wait(), stderr.decode(errors="ignore").strip()
+
+        try:
+            returncode, stderr = await asyncio.wait_for(run(), timeout=timeout or None)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            await self._kill(process)
+            if output.exists():
+                output.unlink()
+            if isinstance(e, asyncio.TimeoutError):
+                metrics.remuxes.inc(status="failed")
+                raise RemuxError(f"Remuxing {path.name} timed out after {timeout}s") from e
+            logger.debug(f"Remuxing {path.name} cancelled")
+            raise
+
+        if returncode != 0:
+            if output.exists():
+                output.unlink()
+            metrics.remuxes.inc(status="failed")
+            raise RemuxError(f"ffmpeg exited with code {returncode}: {stderr}")
+
+        return self._finalize(path, output, keep_original, start_time)
+
+    async def _read_progress(
+        self, stream: asyncio.StreamReader, progress_callback: Optional[Union[Callable, Coroutine]] = None
+    ) -> Dict[str, str]:
+        """Consume ffmpeg -progress output until EOF, calling progress_callback for every block."""
+        data = {}
+        async for line in stream:
+            if self._parse_progress_line(line, data):
+                logger.debug(
+                    f"Remuxing status: {data.get('progress', 'unknown')} speed: {data.get('speed', '0.00x')} {data.get('fps', '0.00')}fps frame {data.get('frame', '0')}",
+                )
+                if progress_callback:
+                    if iscoroutinefunction(progress_callback):
+                        await progress_callback(**data)
+                    else:
+                        progress_callback(**data)
+        return data
+
+    async def remux_tree(
+        self,
+        root: Path | str,
+        jobs: Optional[int] = None,
+        keep_original: bool = None,
+        force: bool = False,
+        progress_callback: Optional[Union[Callable, Coroutine]] = None,
+    ) -> Dict[str, int]:
+        """
+        Remux every media file under root through a pool of workers.
+
+        Finished files are appended to an index in root, so an interrupted run resumes where it
+        stopped and files that haven't changed since are never processed twice.
+
+        Args:
+            root: Directory to walk
+            jobs: Number of files remuxed at once, defaults to max_concurrent_remuxes or the CPU count
+            keep_original: Keep the original files next to the rmx_ copies
+            force: Remux even if ffprobe says a file is already clean
+            progress_callback: Called with total, done, failed, skipped and current after every file
+
+        Returns:
+            Dict with total, done, failed and skipped file counts
+        """
+        root = Path(root)
+        if keep_original is None:
+            keep_original = self.config.get("keep_original", True, "ffmpeg")
+        jobs = jobs or self.config.get_as_number("max_concurrent_remuxes", 0, "ffmpeg") or os.cpu_count() or 1
+
+        index = await asyncio.to_thread(RemuxIndex, root)
+        pending, skipped = await asyncio.to_thread(index.collect)
+        stats = {"total": len(pending) + skipped, "done": skipped, "failed": 0, "skipped": skipped}
+        logger.debug(f"Remuxing {len(pending)} files in {root} with {jobs} jobs, {skipped} already done")
+        files = iter(pending)
+
+        async def worker():
+            # All workers pull from the same iterator, so only `jobs` files are in flight at once
+            for path in files:
+                try:
+                    await self.remux_async(path, keep_original=keep_original, force=force)
+                    index.add(path)
+                    stats["done"] += 1
+                except Exception as e:
+                    # One bad file (ffmpeg error, deleted mid-run, unreadable) must not stop the other workers
+                    logger.debug(f"Failed to remux {path}: {e}")
+                    stats["failed"] += 1
+                if progress_callback:
+                    if iscoroutinefunction(progress_callback):
+                        await progress_callback(**stats, current=path)
+                    else:
+                        progress_callback(**stats, current=path)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(max(1, int(jobs)))))
+        finally:
+            index.close()
+        return stats
+
+    @staticmethod
+    def can_stream(filename: Path | str) -> bool:
+        """
+        Check if a file can be remuxed while it's being downloaded.
+
+        Containers that may keep their index at the end of the file (mp4, mov, ...) need a seekable
+        input and have to be remuxed from disk instead.
+        """
+        return Path(filename).suffix.lower() in STREAMABLE_EXTENSIONS and shutil.which("ffmpeg") is not None
+
+    def stream(self, output: Path | str, progress_callback: Optional[Union[Callable, Coroutine]] = None) -> "RemuxStream":
+        """
+        Create a sink that remuxes bytes written to it straight into output.
+
+        Usage:
+            async with remuxer.stream(path) as sink:
+                await sink.write(chunk)
+        """
+        return RemuxStream(self, Path(output), progress_callback)
+
+    @staticmethod
+    async def _kill(process: asyncio.subprocess.Process) -> None:
+        """Kill an ffmpeg process and reap it."""
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await asyncio.shield(process.wait())
+
+
+class RemuxStream:
+    """Writable sink piping a download into ffmpeg's stdin, so the remuxed file is written to disk only once."""
+
+    def __init__(self, remuxer: Remuxer, output: Path, progress_callback: Optional[Union[Callable, Coroutine]] = None):
+        self.remuxer = remuxer
+        self.output = output
+        self.progress_callback = progress_callback
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._readers: Optional[asyncio.Future] = None
+
+    async def __aenter__(self) -> "RemuxStream":
+        await asyncio.to_thread(ffmpeg_capabilities)
+        command = self.remuxer._build_command("pipe:0", self.output)
+        logger.debug(f"Streaming remux into {self.output.name}")
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                *command,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except OSError as e:
+            raise RemuxError(f"Failed to start ffmpeg: {e}") from e
+        # Keep draining ffmpeg's output so it never blocks on a full pipe
+        self._readers = asyncio.gather(
+            self.remuxer._read_progress(self.process.stdout, self.progress_callback),
+            self.process.stderr.read(),
         )
-        return output
+        return self
+
+    async def write(self, chunk: bytes) -> None:
+        """Feed a chunk of the input file to ffmpeg."""
+        try:
+            self.process.stdin.write(chunk)
+            await self.process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as e:
+            raise RemuxError(f"ffmpeg stopped reading input for {self.output.name}") from e
+
+    async def close(self) -> Path:
+        """Signal end of input and wait for ffmpeg to finish writing the output."""
+        try:
+            self.process.stdin.close()
+            await self.process.stdin.wait_closed()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        _, stderr = await self._readers
+        returncode = await self.process.wait()
+        if returncode != 0:
+            if self.output.exists():
+                self.output.unlink()
+            metrics.remuxes.inc(status="failed")
+            raise RemuxError(f"ffmpeg exited with code {returncode}: {stderr.decode(errors='ignore').strip()}")
+        metrics.remuxes.inc(status="done")
+        return self.output
+
+    async def abort(self) -> None:
+        """Stop ffmpeg and remove the partial output."""
+        await self.remuxer._kill(self.process)
+        if self._readers:
+            self._readers.cancel()
+        if self.output.exists():
+            self.output.unlink()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is not None:
+            await self.abort()
+            return
+        await self.close()
+
+
+class RemuxIndex:
+    """Append-only record of the files remux_tree has finished, keyed by relative path, size and mtime."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.path = root / INDEX_FILENAME
+        self.entries: Dict[str, Tuple[int, int]] = {}
+        self._file = None
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.entries[entry["path"]] = (entry["size"], entry["mtime"])
+                    except (ValueError, KeyError, TypeError):
+                        # Last line may be cut short if the previous run was killed mid-write
+                        continue
+
+    def collect(self) -> Tuple[List[Path], int]:
+        """
+        Walk the tree for media files that aren't in the index yet.
+
+        Returns:
+            Tuple of (files to remux, number of files already done)
+        """
+        pending, skipped = [], 0
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = Path(directory) / filename
+                if filename.startswith("rmx_") or path.suffix.lower() not in MEDIA_EXTENSIONS:
+                    continue
+                try:
+                    stat = path.stat()
+                except OSError as e:
+                    # Broken symlinks and files removed during the walk
+                    logger.debug(f"Skipping {path}: {e}")
+                    continue
+                if self.entries.get(self._key(path)) == (stat.st_size, stat.st_mtime_ns):
+                    skipped += 1
+                else:
+                    pending.append(path)
+        return pending, skipped
+
+    def add(self, path: Path) -> None:
+        """Record path as done with its current size and mtime."""
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+        stat = path.stat()
+        key = self._key(path)
+        self.entries[key] = (stat.st_size, stat.st_mtime_ns)
+        self._file.write(json.dumps({"path": key, "size": stat.st_size, "mtime": stat.st_mtime_ns}) + "\n")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _key(self, path: Path) -> str:
+        return path.relative_to(self.root).as_posix()
 
 
 remux = Remuxer.remux
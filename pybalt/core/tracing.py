@@ -0,0 +1,124 @@
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from time import perf_counter_ns
+from typing import Any, Dict, Iterator, List, Optional
+from weakref import WeakKeyDictionary
+import asyncio
+import itertools
+import json
+import os
+import threading
+
+
+class Tracer:
+    """Records spans and exports them in the Chrome trace event format.
+
+    Every asyncio task gets its own lane in the timeline, so concurrent downloads, instance requests
+    and remuxes show up side by side. Open the exported file in https://ui.perfetto.dev or chrome://tracing.
+    """
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        # Lanes are weakly keyed by task so finished tasks don't stay alive for the whole batch
+        self._task_lanes: WeakKeyDictionary = WeakKeyDictionary()
+        self._thread_lanes: Dict[int, int] = {}
+        self._lane_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._start = perf_counter_ns()
+
+    def _lane(self) -> int:
+        """Return the timeline lane for the current asyncio task, or thread outside of an event loop."""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        lanes, key = (self._task_lanes, task) if task is not None else (self._thread_lanes, threading.get_ident())
+        lane = lanes.get(key)
+        if lane is None:
+            with self._lock:
+                lane = lanes[key] = next(self._lane_ids)
+                name = task.get_name() if task is not None else threading.current_thread().name
+                self.events.append({"name": "thread_name", "ph": "M", "pid": self._pid, "tid": lane, "args": {"name": name}})
+        return lane
+
+    @contextmanager
+    def span(self, name: str, category: str = "pybalt", **args) -> Iterator[Dict[str, Any]]:
+        """Record the time spent inside the block as a complete event.
+
+        Yields the event args, so results known only at the end of the block can be added to them.
+        """
+        lane = self._lane()
+        start = perf_counter_ns()
+        try:
+            yield args
+        finally:
+            end = perf_counter_ns()
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (start - self._start) / 1000,
+                "dur": (end - start) / 1000,
+                "pid": self._pid,
+                "tid": lane,
+            }
+            if args:
+                event["args"] = {
+                    key: value if isinstance(value, (int, float, bool)) or value is None else str(value) for key, value in args.items()
+                }
+            with self._lock:
+                self.events.append(event)
+
+    def write(self, path: Path | str) -> None:
+        """Write the recorded spans as Chrome trace JSON."""
+        with self._lock:
+            events = list(self.events)
+        Path(path).write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}), encoding="utf-8")
+
+
+# Tracing is opt-in, spans are no-ops until start_tracing is called
+_tracer: Optional[Tracer] = None
+
+
+class _DiscardArgs(dict):
+    """Span args of a disabled tracer, writes are dropped so one shared instance never collects state."""
+
+    def __setitem__(self, key, value) -> None:
+        pass
+
+    def update(self, *args, **kwargs) -> None:
+        pass
+
+    def setdefault(self, key, default=None):
+        return default
+
+
+_null_span = nullcontext(_DiscardArgs())
+
+
+def start_tracing() -> Tracer:
+    """Start recording spans process-wide and return the tracer."""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+
+def stop_tracing() -> Optional[Tracer]:
+    """Stop recording spans and return the tracer that was active, if any."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    """Return the active tracer, or None if tracing is off."""
+    return _tracer
+
+
+def span(name: str, category: str = "pybalt", **args):
+    """Record a span with the active tracer, or do nothing if tracing is off."""
+    if _tracer is None:
+        return _null_span
+    return _tracer.span(name, category, **args)
@@ -0,0 +1,167 @@
+from typing import Iterable, Iterator, Optional, Set
+from urllib.parse import parse_qsl, urlencode, urlsplit
+import hashlib
+import math
+import re
+from .logging_utils import get_logger
+from .network import YOUTUBE_PLAYLIST_ID
+
+
+logger = get_logger(__name__)
+
+_YOUTUBE_HOSTS = {"youtube.com", "music.youtube.com", "youtu.be", "youtube-nocookie.com"}
+_YOUTUBE_VIDEO_ID = re.compile(r"(?:[?&]v=|youtu\.be/|/(?:shorts|embed|live|v)/)([\w-]{11})")
+# Service name and the pattern capturing the media ID, matched against the URL without scheme and www.
+_SERVICES = (
+    ("twitter", re.compile(r"^(?:mobile\.)?(?:twitter|x|fxtwitter|vxtwitter|fixupx)\.com/(?:[^/]+/|i/web/)?status(?:es)?/(\d+)")),
+    ("instagram", re.compile(r"^instagram\.com/(?:[\w.]+/)?(?:p|reels?|tv)/([\w-]+)")),
+    ("tiktok", re.compile(r"^tiktok\.com/(?:@[^/]+/(?:video|photo)|v)/(\d+)")),
+    ("reddit", re.compile(r"^(?:old\.|new\.)?reddit\.com/(?:r/[^/]+/)?comments/(\w+)")),
+    ("reddit", re.compile(r"^redd\.it/(\w+)")),
+    ("bilibili", re.compile(r"^bilibili\.com/video/(BV\w+|av\d+)", re.IGNORECASE)),
+    ("vimeo", re.compile(r"^(?:player\.)?vimeo\.com/(?:video/)?(\d+)")),
+    ("dailymotion", re.compile(r"^dailymotion\.com/video/([a-z0-9]+)")),
+)
+# Query parameters that only track where a link was shared from
+_TRACKING_PARAMS = {"si", "feature", "fbclid", "gclid", "igsh", "igshid", "ref", "ref_src", "ref_url", "is_from_webapp"}
+
+
+def canonical_key(url: str) -> str:
+    """
+    Return a stable key for the media a URL points to, so different links to the same video compare equal.
+
+    Links to a supported service map to service:id, e.g. youtu.be/ID, youtube.com/watch?v=ID&si=... and
+    m.youtube.com/shorts/ID all give youtube:ID. Other links are normalized: lowercase host without www.
+    and m., no scheme, fragment, trailing slash or tracking parameters, and the remaining query sorted.
+    """
+    url = url.strip()
+    parts = urlsplit(url if "://" in url else f"https://{url}")
+    host = parts.netloc.lower().rsplit("@", 1)[-1].split(":", 1)[0]
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix) :]
+
+    path = parts.path.rstrip("/")
+    # Match on the parsed host, so youtube.com.example.net isn't taken for YouTube
+    if host in _YOUTUBE_HOSTS:
+        video_id = _YOUTUBE_VIDEO_ID.search(f"{host}{path}?{parts.query}")
+        if video_id:
+            return f"youtube:{video_id.group(1)}"
+        playlist_id = YOUTUBE_PLAYLIST_ID.search(f"?{parts.query}")
+        if playlist_id:
+            return f"youtube-playlist:{playlist_id.group(1)}"
+
+    for service, pattern in _SERVICES:
+        match = pattern.match(f"{host}{path}")
+        if match:
+            return f"{service}:{match.group(1)}"
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in _TRACKING_PARAMS and not key.startswith("utm_")
+    )
+    return f"{host}{path}?{urlencode(query)}" if query else f"{host}{path}"
+
+
+class BloomFilter:
+    """
+    Set membership in a fixed amount of memory, with a small chance of reporting an unseen key as seen.
+
+    Args:
+        capacity: Number of keys the filter is sized for, the false positive rate grows past it
+        error_rate: False positive rate at capacity
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> Iterator[int]:
+        # Two halves of one digest generate every position (Kirsch-Mitzenmacher)
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, key: str) -> bool:
+        """Add a key, returns True if it was (probably) already present."""
+        present = True
+        for position in self._positions(key):
+            byte, bit = divmod(position, 8)
+            if not self._bits[byte] & (1 << bit):
+                present = False
+                self._bits[byte] |= 1 << bit
+        if not present:
+            self.count += 1
+        return present
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position // 8] & (1 << position % 8) for position in self._positions(key))
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class Deduper:
+    """
+    Drops URLs whose canonical key was already seen.
+
+    Keys are kept in an exact set until there are exact_limit of them, then they move into a Bloom filter
+    sized for expected_items, so inputs with millions of lines dedupe in flat memory. Past that point a
+    small share (about false_positive_rate) of new URLs can be dropped as duplicates.
+
+    Usage:
+        deduper = Deduper()
+        unique_urls = list(deduper.filter(urls))
+    """
+
+    def __init__(self, exact_limit: int = 100_000, expected_items: int = 10_000_000, false_positive_rate: float = 0.001):
+        self.exact_limit = exact_limit
+        self.expected_items = max(expected_items, exact_limit)
+        self.false_positive_rate = false_positive_rate
+        self.duplicates = 0
+        self._keys: Optional[Set[str]] = set()
+        self._bloom: Optional[BloomFilter] = None
+
+    @property
+    def exact(self) -> bool:
+        """True while keys are compared exactly."""
+        return self._bloom is None
+
+    def seen(self, url: str) -> bool:
+        """Record a URL and return True if the same media was seen before."""
+        key = canonical_key(url)
+        if self._bloom is not None:
+            duplicate = self._bloom.add(key)
+        elif key in self._keys:
+            duplicate = True
+        else:
+            duplicate = False
+            self._keys.add(key)
+            if len(self._keys) >= self.exact_limit:
+                self._switch_to_bloom()
+        if duplicate:
+            self.duplicates += 1
+            logger.debug(f"Dropping duplicate URL {url} ({key})")
+        return duplicate
+
+    def _switch_to_bloom(self) -> None:
+        logger.debug(f"Deduplicating with a Bloom filter after {len(self._keys)} unique URLs")
+        self._bloom = BloomFilter(self.expected_items, self.false_positive_rate)
+        for key in self._keys:
+            self._bloom.add(key)
+        self._keys = None
+
+    def filter(self, urls: Iterable[str]) -> Iterator[str]:
+        """Yield the URLs that weren't seen before."""
+        for url in urls:
+            if not self.seen(url):
+                yield url
+
+    def __len__(self) -> int:
+        return len(self._bloom) if self._bloom is not None else len(self._keys)
@@ -1,9 +1,15 @@
-from .config import Config
-from .network import HttpClient
+from .config import Config, get_config, is_fast_mode
+from .network import HttpClient, DownloadTiming
 from .local import LocalInstance
-from .remux import Remuxer
+from .remux import Remuxer, RemuxError
+from .journal import Journal
+from .urls import Deduper
+from . import metrics, tracing
 from .logging_utils import get_logger
+from ..misc.tracker import get_tracker
 from typing import (
+    Callable,
+    Coroutine,
     TypedDict,
     Optional,
     List,
@@ -12,18 +18,42 @@ from typing import (
     Literal,
     Unpack,
     AsyncGenerator,
+    AsyncIterable,
+    Iterable,
     Tuple,
 )
 from pathlib import Path
+from collections import deque
+from collections.abc import Sized
 import logging
 import asyncio
+from contextlib import nullcontext
 from ipaddress import ip_address
+from urllib.parse import urlparse
 from time import time
 import os
 
 
 logger = get_logger(__name__)
 
+# Set once the warranty warning was considered in this process
+_warned = False
+
+
+def _show_warranty_warning(config: Config) -> None:
+    """Print the no-warranty notice at most once a day, the first time a manager is created."""
+    global _warned
+    if _warned or is_fast_mode():
+        return
+    _warned = True
+    if config.get_state("last_warn", 0) < time() - 60 * 60 * 24:
+        print("!!! THIS SOFTWARE COMES WITH NO WARRANTY !!!")
+        print(
+            "When downloading files, you are responsible for ensuring the safety of the content. Downloading files from untrusted instances may expose you to malware or other risks."
+        )
+        print("Please use this software responsibly and at your own risk.")
+        config.set_state("last_warn", time())
+
 
 class CobaltRequestParams(TypedDict, total=False):
     """Type definition for Cobalt API request parameters."""
@@ -101,6 +131,31 @@ class CobaltPickerResponse(CobaltResponse):
     audioFilename: Optional[str]
 
 
+class DownloadResult(tuple):
+    """
+    (url, file_path, exception) tuple yielded by download_generator.
+
+    Unpacks like a plain tuple and carries the DownloadTiming breakdown of the job in `timing`.
+    """
+
+    def __new__(cls, url: str, file_path: Optional[Path | List[Path]], error: Optional[Exception], timing: Optional[DownloadTiming] = None):
+        result = super().__new__(cls, (url, file_path, error))
+        result.timing = timing
+        return result
+
+    @property
+    def url(self) -> str:
+        return self[0]
+
+    @property
+    def file_path(self) -> Optional[Path | List[Path]]:
+        return self[1]
+
+    @property
+    def error(self) -> Optional[Exception]:
+        return self[2]
+
+
 class InstanceInfo(TypedDict, total=False):
     """Information about a Cobalt instance."""
 
@@ -142,7 +197,7 @@ class Instance:
             client: HTTP client
             debug: Enable debug logging
         """
-        self.config = config or Config()
+        self.config = config or get_config()
         self.debug = debug or self.config.get("debug", False, "general")
 
         if self.debug:
@@ -279,16 +334,19 @@ class InstanceManager:
         self,
         debug: bool = None,
         config: Config = None,
-        client: HttpClient = HttpClient(),
+        client: HttpClient = None,
     ):
-        self.config = config or Config()
+        self.config = config or get_config()
         self.debug = debug or self.config.get("debug", False, "general")
         if self.debug:
             global logger
             logger = get_logger(__name__, debug=True)
+        _show_warranty_warning(self.config)
 
-        self.client = client
+        self.client = client or HttpClient(config=self.config)
         self.local_instance = LocalInstance(config=self.config)
+        self.local_instances = self.local_instance.get_replicas()
+        self._local_turn = 0
         self.user_instances = [
             Instance(
                 url=user_instance.get("url"),
@@ -308,6 +366,45 @@ class InstanceManager:
             debug=self.debug,
         )
 
+    def _build_instances(self, config: Config) -> Tuple[List[Instance], Instance]:
+        """
+        Create the user and fallback instances from config, reusing the current ones that didn't change.
+
+        Returns:
+            Tuple of (user_instances, fallback_instance)
+        """
+        current = {(instance.api_url, instance.api_key): instance for instance in self.user_instances + [self.fallback_instance]}
+
+        def build(url: str, api_key: Optional[str]) -> Instance:
+            instance = Instance(url=url, api_key=api_key, config=config, client=self.client, debug=self.debug)
+            return current.get((instance.api_url, instance.api_key), instance)
+
+        user_instances = [
+            build(user_instance.get("url"), user_instance.get("api_key", None)) for user_instance in config.get_user_instances()
+        ]
+        fallback_instance = build(
+            config.get("fallback_instance", "https://dwnld.nichind.dev", "instances"),
+            config.get("fallback_instance_api_key", None, "instances"),
+        )
+        return user_instances, fallback_instance
+
+    def apply_config(self, config: Config = None) -> None:
+        """
+        Apply a reloaded config to the running manager.
+
+        New instance lists are built first and swapped in at once, unchanged instances are kept along with
+        their cached info, and downloads already in flight keep running with the settings they started with.
+
+        Args:
+            config: Config to apply, defaults to the manager's own config
+        """
+        config = config or self.config
+        user_instances, fallback_instance = self._build_instances(config)
+        if self.client is not None:
+            self.client.apply_config(config)
+        self.config, self.user_instances, self.fallback_instance = config, user_instances, fallback_instance
+        logger.debug(f"Applied config: {len(user_instances)} user instances, fallback {fallback_instance.api_url}")
+
     @property
     def all_instances(self) -> List[Instance]:
         """_summary_
@@ -316,7 +413,7 @@ class InstanceManager:
             List[Instance]: _description_
         """
         return (
-            ([self.local_instance] if self.local_instance.get_instance_status().get("running", False) else [])
+            [local for local in self.local_instances if local.healthy]
             + self.user_instances
             + self.fetched_instances
             + [self.fallback_instance]
@@ -422,24 +519,12 @@ class InstanceManager:
         # if not self.fetched_instances:
         #     await self.fetch_instances()
 
-        self.local_instance = LocalInstance(config=self.config)
-        self.user_instances = [
-            Instance(
-                url=user_instance.get("url"),
-                api_key=user_instance.get("api_key", None),
-                config=self.config,
-                client=self.client,
-                debug=self.debug,
-            )
-            for user_instance in self.config.get_user_instances()
-        ]
-        self.fallback_instance = Instance(
-            url=self.config.get("fallback_instance", "https://dwnld.nichind.dev", "instances"),
-            api_key=self.config.get("fallback_instance_api_key", None, "instances"),
-            config=self.config,
-            client=self.client,
-            debug=self.debug,
-        )
+        # Keep the local instances between calls so their health checks stay cached
+        if self.local_instance.config is not self.config or len(self.local_instances) != self.local_instance.replicas:
+            self.local_instance = LocalInstance(config=self.config)
+            self.local_instances = self.local_instance.get_replicas()
+        await asyncio.gather(*(local.is_healthy() for local in self.local_instances))
+        self.user_instances, self.fallback_instance = self._build_instances(self.config)
 
         # Filter out ignored instances if specified
         all_instances = self.all_instances
@@ -453,6 +538,32 @@ class InstanceManager:
         logger.debug(str(all_instances))
         return all_instances
 
+    def _pick_local_replica(
+        self, instances: List[Instance | LocalInstance]
+    ) -> Tuple[List[Instance | LocalInstance], Optional[LocalInstance]]:
+        """
+        Keep only the local replica with the fewest outstanding requests in the instances to race.
+
+        Ties are broken round robin, so idle replicas share the load too.
+
+        Returns:
+            Tuple of (instances, picked local replica or None)
+        """
+        replicas = [instance for instance in instances if isinstance(instance, LocalInstance)]
+        if not replicas:
+            return instances, None
+        self._local_turn = (self._local_turn + 1) % len(replicas)
+        rotated = replicas[self._local_turn :] + replicas[: self._local_turn]
+        picked = min(rotated, key=lambda replica: replica.outstanding)
+        return [instance for instance in instances if not isinstance(instance, LocalInstance) or instance is picked], picked
+
+    def _track_local(self, host: Optional[str]):
+        """Count a download as outstanding on the local replica serving host, if it is one."""
+        for local in self.local_instances:
+            if host and urlparse(local.api_url).netloc == host:
+                return local.track()
+        return nullcontext()
+
     async def first_tunnel_generator(
         self,
         urls: List[str],
@@ -460,6 +571,7 @@ class InstanceManager:
         close: bool = True,
         ignored_instances: Optional[List[str]] = None,
         force_instance_origin: bool = True,
+        timing: Optional[DownloadTiming] = None,
         **params: Unpack[CobaltRequestParams],
     ) -> AsyncGenerator[
         Union[
@@ -475,7 +587,11 @@ class InstanceManager:
         all_ignored = list(set(params_ignored + (ignored_instances or [])))
 
         # Get instances, filtering out ignored ones
+        selection_start = time()
         instances = await self.get_instances(all_ignored)
+        instances, local_replica = self._pick_local_replica(instances)
+        if timing is not None:
+            timing.instance_selection += time() - selection_start
 
         if not instances:
             logger.warning("No available instances after filtering out ignored instances")
@@ -488,18 +604,22 @@ class InstanceManager:
         }
         for url in urls:
             try:
-                response = await self.client.bulk_post(
-                    [{"url": instance.api_url, "api_key": instance.api_key} for instance in instances],
-                    data={
-                        "url": url.replace("\\", ""),
-                        **params,
-                    },
-                    headers=headers,
-                    close=close,
-                )
+                with local_replica.track() if local_replica else nullcontext():
+                    response = await self.client.bulk_post(
+                        [{"url": instance.api_url, "api_key": instance.api_key} for instance in instances],
+                        data={
+                            "url": url.replace("\\", ""),
+                            **params,
+                        },
+                        headers=headers,
+                        close=close,
+                        timing=timing,
+                    )
                 data = await response.json()
                 # Add responding instance information to the response
                 responding_instance = response.url.split("/")[2] if response.url else None
+                if timing is not None:
+                    timing.winner = responding_instance
                 if responding_instance:
                     if "instance_info" not in data:
                         data["instance_info"] = {}
@@ -522,7 +642,7 @@ class InstanceManager:
                             # Extract the base URL of the instance
                             instance_base = "/".join(instance_url.split("/")[:3])  # Get protocol and host part
                             # Only replace if not using a local instance intentionally
-                            if not (self.local_instance and self.local_instance.api_url in instance_url):
+                            if not any(local.api_url in instance_url for local in self.local_instances):
                                 path_part = "/" + "/".join(response_url.split("/")[3:]) if len(response_url.split("/")) > 3 else ""
                                 data["url"] = f"{instance_base}{path_part}"
                                 logger.debug(f"Replaced local URL {response_url} with {data['url']}")
@@ -540,7 +660,11 @@ class InstanceManager:
                 logger.debug(f"Error processing URL {url}: {e}")
 
     async def first_tunnel(
-        self, url: str, ignored_instances: Optional[List[str]] = None, **params: Unpack[CobaltRequestParams]
+        self,
+        url: str,
+        ignored_instances: Optional[List[str]] = None,
+        timing: Optional[DownloadTiming] = None,
+        **params: Unpack[CobaltRequestParams],
     ) -> Union[
         CobaltTunnelResponse,
         CobaltRedirectResponse,
@@ -553,19 +677,20 @@ class InstanceManager:
         Args:
             url: URL to process
             ignored_instances: List of instance URLs to ignore
+            timing: DownloadTiming to record instance selection and resolve times into
             params: Request parameters
 
         Returns:
             Response from the first successful instance
         """
-        generator = self.first_tunnel_generator(urls=[url], only_first=True, ignored_instances=ignored_instances, **params)
+        generator = self.first_tunnel_generator(urls=[url], only_first=True, ignored_instances=ignored_instances, timing=timing, **params)
         async for response in generator:
             return response
 
     async def download_generator(
         self,
         url: str = None,
-        urls: List[str] = None,
+        urls: Iterable[str] | AsyncIterable[str] = None,
         ignored_instances: Optional[List[str]] = None,
         only_path: bool = True,
         remux: bool = False,
@@ -573,28 +698,51 @@ class InstanceManager:
         max_retries: int = None,  # Prevent infinite retry loops
         filename: Optional[str] = None,
         folder_path: Optional[Path | str] = None,
+        max_concurrent_remuxes: int = None,
+        stream_remux: bool = None,
+        status_callback: Optional[Union[Callable, Coroutine]] = None,
+        done_callback: Optional[Union[Callable, Coroutine]] = None,
+        max_concurrent: int = None,
+        keep_original: bool = False,
+        journal: Optional[Journal] = None,
+        dedupe: bool | Deduper = False,
         **params: Unpack[CobaltRequestParams],
-    ) -> AsyncGenerator[Path | List[Path] | Tuple[str, Optional[Path | List[Path]], Optional[Exception]], None]:
+    ) -> AsyncGenerator[Path | List[Path] | DownloadResult, None]:
         """
         Download multiple files from Cobalt, yielding results as they complete.
 
         Args:
             url: Single URL to download (alternative to urls)
-            urls: Multiple URLs to download
+            urls: Multiple URLs to download, as any iterable or async iterable. URLs are read lazily, the next one is
+                only taken once a download slot is free, so only jobs in flight are held in memory and an async
+                iterable can be fed from an endless stream
             ignored_instances: List of instance URLs to ignore
             only_path: If True, yield only the file path instead of the full result tuple
             remux: If True, remux the downloaded file
             min_file_size: Minimum acceptable file size in bytes (files smaller than this are considered "ghost files")
             max_retries: Maximum number of retry attempts for ghost files
+            max_concurrent_remuxes: Maximum number of files remuxed at once, defaults to the CPU count.
+                Remuxing runs as a separate stage, so a finished download frees its slot right away
+            stream_remux: Pipe downloads straight into ffmpeg instead of remuxing them from disk afterwards,
+                falls back to file-based remuxing for containers that need a seekable input
+            status_callback: Called with progress data while each file downloads
+            done_callback: Called with completion data, including the DownloadTiming as `timing`, after each file downloads
+            max_concurrent: Maximum number of URLs resolved and downloaded at once, defaults to max_concurrent_downloads
+            keep_original: Keep the downloaded file next to the remuxed copy, doesn't apply to files remuxed while streaming
+            journal: Journal recording the state of every URL. URLs it lists as done are skipped without being yielded,
+                and downloads interrupted in a previous run continue from the partial file if the server supports ranges
+            dedupe: Drop URLs pointing to media that was already queued, e.g. youtu.be/ID after youtube.com/watch?v=ID,
+                before any request is made for them. Dropped URLs get no result. Off by default, so every input URL is
+                yielded once. Pass a Deduper to share it across runs
             **params: Parameters for the Cobalt API request
 
         Yields:
-            Tuples of (url, file_path, exception) where:
+            DownloadResult tuples of (url, file_path, exception) where:
             - url is the original URL requested
             - file_path is the Path to the downloaded file, or if the response was a picker, a list of Paths (None if failed)
             - exception is the exception that occurred (None if successful)
+            The DownloadTiming of the job is available as `result.timing`
         """
-        # Check if bulk download is allowed in config
         urls = urls or [url]
         if not urls:
             raise ValueError("Either url or urls must be provided")
@@ -602,12 +750,17 @@ class InstanceManager:
         # Check max_retries
         max_retries = max_retries or self.config.get_as_number("max_retries_tunnel", 10, section="network")
 
-        if urls and len(urls) > 1 and not self.config.get("allow_bulk_download", True, section="misc"):
+        # Check if bulk download is allowed in config, iterables of unknown length count as bulk
+        if not (isinstance(urls, Sized) and len(urls) <= 1) and not self.config.get("allow_bulk_download", True, section="misc"):
             raise ValueError("Bulk downloads are disabled in configuration")
 
-        complete_urls = []
-        for url in urls:
-            complete_urls += self.client.detect_playlist(url=url)
+        deduper = dedupe if isinstance(dedupe, Deduper) else Deduper() if dedupe else None
+
+        # URLs are read as download slots free up instead of all at once
+        if hasattr(urls, "__aiter__"):
+            source, sync_source = urls.__aiter__(), None
+        else:
+            source, sync_source = None, iter(urls)
 
         # Remove False params
         params = {k: v for k, v in params.items() if v is not False}
@@ -616,24 +769,70 @@ class InstanceManager:
         current_ignored_instances = list(ignored_instances or [])
 
         # Get the maximum number of concurrent downloads from config
-        max_concurrent = self.config.get_as_number("max_concurrent_downloads", 6, section="network")
+        max_concurrent = max_concurrent or self.config.get_as_number("max_concurrent_downloads", 6, section="network")
 
         # Create a semaphore to limit concurrent downloads
         semaphore = asyncio.Semaphore(max_concurrent)
 
-        # Dictionary to track active download tasks by URL
-        active_downloads = {}
-        # Queue of pending URLs
-        pending_urls = complete_urls.copy()
+        # Remuxing is CPU bound, so it gets its own limit instead of holding a download slot
+        max_concurrent_remuxes = max_concurrent_remuxes or self.config.get_as_number("max_concurrent_remuxes", 0, section="ffmpeg")
+        remux_semaphore = asyncio.Semaphore(max_concurrent_remuxes or os.cpu_count() or 1)
+        remuxer = Remuxer(config=self.config)
+        tracker = get_tracker()
+        if stream_remux is None:
+            stream_remux = self.config.get("stream_remux", False, section="ffmpeg")
+        # Files that were already remuxed while downloading skip the remux stage
+        stream_remuxed_paths = set()
+
+        # Active download tasks mapped to their URL, so the same URL can be in flight twice
+        active_downloads: Dict[asyncio.Task, str] = {}
+        # Set of remux tasks fed by completed downloads
+        active_remuxes = set()
+        # URLs read from the input but not started yet, e.g. the rest of an expanded playlist
+        pending_urls = deque()
+        # URLs the journal caught mid-download, their partial files are continued
+        resume_urls = set()
+        # URLs the journal lists as done, reported once when the generator finishes
+        journal_skipped = 0
+
+        def queue_urls(new_urls):
+            nonlocal journal_skipped
+            for new_url in new_urls:
+                if journal is not None:
+                    state = journal.state(new_url)
+                    if state == Journal.DONE:
+                        journal_skipped += 1
+                        continue
+                    if state == Journal.DOWNLOADING:
+                        resume_urls.add(new_url)
+                    else:
+                        journal.record(new_url, Journal.QUEUED)
+                pending_urls.append(new_url)
+
+        def finish(result):
+            if journal is not None:
+                if result.error is None and result.file_path:
+                    journal.record(result.url, Journal.DONE, path=result.file_path)
+                else:
+                    journal.record(result.url, Journal.FAILED, error=result.error or "No file downloaded")
+            return result.file_path if only_path else result
 
-        logger.debug(f"Starting download_generator with {len(complete_urls)} URLs, max_concurrent={max_concurrent}")
+        logger.debug(f"Starting download_generator with max_concurrent={max_concurrent}")
 
         # Helper function to process a single URL
-        async def process_url(url):
+        async def process_url(url, timing):
             retry_count = 0
+            use_stream_remux = remux and stream_remux
+            if journal is not None:
+                journal.record(url, Journal.RESOLVING)
             while retry_count <= max_retries:
                 try:
-                    response = await self.first_tunnel(url, close=False, ignored_instances=current_ignored_instances, **params)
+                    with tracing.span("resolve", "resolve", url=url, attempt=retry_count):
+                        response = await self.first_tunnel(
+                            url, close=False, ignored_instances=current_ignored_instances, timing=timing, **params
+                        )
+                    if response is None:
+                        return url, None, ValueError("No instance could process the URL")
                     if response.get("status", "") == "error":
                         error = ValueError(f"Error: {response['error']['code']}")
                         return url, None, error
@@ -644,30 +843,55 @@ class InstanceManager:
                         # Get the instance that responded
                         responding_instance = response.get("instance_info", {}).get("url")
 
-                        # Create a download task using detached_download
+                        if journal is not None:
+                            journal.record(url, Journal.DOWNLOADING)
+
+                        # Create a download task using detached_download, only the first attempt continues a partial file
                         download_task = await self.client.detached_download(
                             url=download_url,
                             filename=filename or response.get("filename"),
                             folder_path=folder_path,
                             timeout=self.config.get("download_timeout", 60),
                             progressive_timeout=True,
+                            remux_stream=use_stream_remux,
+                            status_callback=status_callback,
+                            done_callback=done_callback,
+                            timing=timing,
+                            resume=url in resume_urls,
                         )
+                        resume_urls.discard(url)
 
                         try:
-                            file_path = await download_task
+                            with (
+                                tracing.span("download", "download", url=url, instance=responding_instance),
+                                self._track_local(responding_instance),
+                            ):
+                                file_path = await download_task
+                        except RemuxError as e:
+                            # The input couldn't be remuxed from a pipe, download it again and remux from disk
+                            logger.debug(f"Streaming remux failed for {url}, falling back to file remux: {e}")
+                            metrics.tunnel_retries.inc(reason="stream_remux")
+                            timing.retries += 1
+                            use_stream_remux = False
+                            continue
                         except Exception as e:
                             logger.debug(f"Download failed for {url}: {e}")
                             if retry_count < max_retries:
                                 retry_count += 1
                                 logger.debug(f"Retrying download for {url}, attempt {retry_count}/{max_retries}")
+                                metrics.tunnel_retries.inc(reason="error")
+                                timing.retries += 1
                                 continue
                             return url, None, e
 
                         # Check if file is a "ghost file" (too small)
-                        if file_path and file_path.exists():
-                            file_size = file_path.stat().st_size
+                        with tracing.span("ghost_check", "download", url=url):
+                            is_file = file_path and file_path.exists()
+                            file_size = file_path.stat().st_size if is_file else 0
+                        if is_file:
                             if file_size < min_file_size:
                                 logger.warning(f"Ghost file detected from {responding_instance}: {file_path} ({file_size} bytes)")
+                                metrics.ghost_files.inc(instance=responding_instance or "")
 
                                 # Add responding instance to ignored list for retry
                                 if responding_instance and responding_instance not in current_ignored_instances:
@@ -686,19 +910,15 @@ class InstanceManager:
                                     logger.debug(
                                         f"Retrying download for {url}, attempt {retry_count}/{max_retries}, ignored: {current_ignored_instances}"
                                     )
+                                    metrics.tunnel_retries.inc(reason="ghost")
+                                    timing.retries += 1
                                     continue
                                 else:
                                     logger.warning(f"Max retries reached for {url}")
                                     return url, None, ValueError("Ghost file detected and max retries reached")
 
-                        # Apply remuxing if requested
-                        if remux and file_path:
-                            try:
-                                remuxed_file_path = await Remuxer().remux(file_path, keep_original=False)
-                                if remuxed_file_path:
-                                    file_path = remuxed_file_path
-                            except Exception as e:
-                                logger.debug(f"Error remuxing file {file_path}: {e}")
+                        if use_stream_remux and file_path and Remuxer.can_stream(file_path):
+                            stream_remuxed_paths.add(file_path)
 
                         return url, file_path, None
                     elif response.get("status", "") == "picker":
@@ -747,15 +967,22 @@ class InstanceManager:
                                     folder_path=folder_path,
                                     timeout=self.config.get("download_timeout", 60),
                                     progressive_timeout=True,
+                                    status_callback=status_callback,
+                                    done_callback=done_callback,
+                                    timing=timing,
                                 )
 
-                                file_path = await download_task
+                                with tracing.span("download", "download", url=item_url, instance=responding_instance):
+                                    file_path = await download_task
 
                                 # Check if file is a "ghost file" (too small)
-                                if file_path and file_path.exists():
-                                    file_size = file_path.stat().st_size
+                                with tracing.span("ghost_check", "download", url=item_url):
+                                    is_file = file_path and file_path.exists()
+                                    file_size = file_path.stat().st_size if is_file else 0
+                                if is_file:
                                     if file_size < min_file_size:
                                         logger.warning(f"Ghost file detected for picker item {idx+1}: {file_path} ({file_size} bytes)")
+                                        metrics.ghost_files.inc(instance=responding_instance or "")
                                         try:
                                             file_path.unlink()
                                         except Exception as e:
@@ -790,66 +1017,148 @@ class InstanceManager:
 
         # Process URLs with controlled concurrency
         async def download_with_semaphore(url):
-            async with semaphore:
+            with tracing.span("wait_download_slot", "queue", url=url):
+                await semaphore.acquire()
+            try:
                 logger.debug(f"Starting download for {url}")
-                result = await process_url(url)
+                timing = DownloadTiming()
+                with tracing.span("job", "download", url=url):
+                    result = DownloadResult(*await process_url(url, timing), timing=timing)
                 logger.debug(f"Completed download for {url}")
                 return result
+            finally:
+                semaphore.release()
+
+        # Remux a downloaded file once a remux slot is free
+        async def remux_with_semaphore(url, file_path, timing):
+            with tracing.span("wait_remux_slot", "queue", url=url):
+                await remux_semaphore.acquire()
+            try:
+                tracker.emit_event(url=url, phase="remux", file_path=str(file_path))
+                remux_start = time()
+                try:
+                    with tracing.span("remux", "remux", url=url, file_path=file_path):
+                        remuxed_file_path = await remuxer.remux_async(file_path, keep_original=keep_original)
+                    if remuxed_file_path:
+                        file_path = remuxed_file_path
+                except Exception as e:
+                    logger.debug(f"Error remuxing file {file_path}: {e}")
+                if timing is not None:
+                    timing.remux += time() - remux_start
+                tracker.emit_event(url=url, phase="remuxed", file_path=str(file_path))
+                return DownloadResult(url, file_path, None, timing=timing)
+            finally:
+                remux_semaphore.release()
+
+        # Expand a playlist link into its videos, in a thread since fetching the playlist blocks.
+        # Duplicates are dropped here, before anything is requested for them
+        async def expand_playlist(next_url):
+            if deduper is not None and deduper.seen(next_url):
+                return []
+            if not self.client.is_playlist(next_url):
+                return [next_url]
+            with tracing.span("expand_playlist", "resolve", url=next_url) as span:
+                expanded_urls = await asyncio.to_thread(self.client.detect_playlist, next_url)
+                span["urls"] = len(expanded_urls)
+            return list(deduper.filter(expanded_urls)) if deduper is not None else expanded_urls
+
+        # Start downloads until every slot is busy, reading more URLs from a plain iterable as needed
+        async def fill_slots():
+            nonlocal sync_source
+            while len(active_downloads) < max_concurrent:
+                if pending_urls:
+                    next_url = pending_urls.popleft()
+                    active_downloads[asyncio.create_task(download_with_semaphore(next_url))] = next_url
+                    continue
+                if sync_source is None:
+                    return
+                try:
+                    next_url = next(sync_source)
+                except StopIteration:
+                    sync_source = None
+                    return
+                queue_urls(await expand_playlist(next_url))
+
+        async def read_next_url():
+            try:
+                return await anext(source)
+            except StopAsyncIteration:
+                return None
+
+        # Task reading the next URL from an async iterable, only one read is in flight at a time
+        next_url_task = None
+
+        try:
+            await fill_slots()
+
+            # Process downloads and remuxes until all are complete
+            while active_downloads or active_remuxes or next_url_task is not None or source is not None:
+                # Read another URL from the source only when it could start downloading right away
+                if source is not None and next_url_task is None and not pending_urls and len(active_downloads) < max_concurrent:
+                    next_url_task = asyncio.create_task(read_next_url())
+
+                # Wait for any active download or remux to complete, or for the next URL to arrive
+                if active_downloads or active_remuxes or next_url_task:
+                    waiting = [*active_downloads, *active_remuxes]
+                    if next_url_task is not None:
+                        waiting.append(next_url_task)
+                    done, pending = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+                    for task in done:
+                        if task is next_url_task:
+                            next_url_task = None
+                            next_url = task.result()
+                            if next_url is None:
+                                source = None
+                                continue
+                            queue_urls(await expand_playlist(next_url))
+                            await fill_slots()
+                            continue
+
+                        if task in active_remuxes:
+                            active_remuxes.discard(task)
+                            yield finish(task.result())
+                            continue
+
+                        # Remove from active downloads and reuse the slot straight away
+                        completed_url = active_downloads.pop(task)
+                        await fill_slots()
+
+                        try:
+                            result = task.result()
+                        except Exception as e:
+                            logger.error(f"Unexpected error in download task for {completed_url}: {e}")
+                            yield finish(DownloadResult(completed_url, None, e))
+                            continue
+                        url, file_path, error = result
+
+                        # Hand the file over to the remux stage if requested and it wasn't remuxed while downloading
+                        if file_path in stream_remuxed_paths:
+                            stream_remuxed_paths.discard(file_path)
+                        elif remux and isinstance(file_path, Path) and error is None:
+                            active_remuxes.add(asyncio.create_task(remux_with_semaphore(url, file_path, result.timing)))
+                            continue
 
-        # Start initial batch of downloads
-        tasks_to_start = min(max_concurrent, len(pending_urls))
-        for _ in range(tasks_to_start):
-            if pending_urls:
-                url = pending_urls.pop(0)
-                task = asyncio.create_task(download_with_semaphore(url))
-                active_downloads[url] = task
-
-        # Process downloads until all are complete
-        while active_downloads or pending_urls:
-            # If we have both active downloads and pending URLs, wait for one to complete
-            if active_downloads:
-                # Wait for any active download to complete
-                done, pending = await asyncio.wait(active_downloads.values(), return_when=asyncio.FIRST_COMPLETED)
-
-                # Process completed downloads
-                for task in done:
-                    # Find the URL for this task
-                    completed_url = next(url for url, t in active_downloads.items() if t == task)
-                    # Remove from active downloads
-                    del active_downloads[completed_url]
-
-                    try:
-                        url, file_path, error = task.result()
                         # Yield the result
-                        yield file_path if only_path else (url, file_path, error)
-
-                        # Start a new download if any are pending
-                        if pending_urls:
-                            next_url = pending_urls.pop(0)
-                            new_task = asyncio.create_task(download_with_semaphore(next_url))
-                            active_downloads[next_url] = new_task
-                    except Exception as e:
-                        logger.error(f"Unexpected error in download task for {completed_url}: {e}")
-                        yield None if only_path else (completed_url, None, e)
-
-                        # Start a new download if any are pending
-                        if pending_urls:
-                            next_url = pending_urls.pop(0)
-                            new_task = asyncio.create_task(download_with_semaphore(next_url))
-                            active_downloads[next_url] = new_task
-
-            # If no active downloads but we have pending URLs, start a batch
-            elif pending_urls:
-                tasks_to_start = min(max_concurrent, len(pending_urls))
-                for _ in range(tasks_to_start):
-                    if pending_urls:
-                        url = pending_urls.pop(0)
-                        task = asyncio.create_task(download_with_semaphore(url))
-                        active_downloads[url] = task
-
-            # If we somehow have no active downloads and no pending URLs, we're done
-            else:
-                break
+                        yield finish(result)
+
+                # If no active downloads but we have pending URLs, start a batch
+                # If we somehow have nothing to wait for, we're done
+                else:
+                    break
+        finally:
+            # Don't leave downloads or ffmpeg processes running if the consumer stops early
+            outstanding = [task for task in [*active_downloads, *active_remuxes, next_url_task] if task is not None and not task.done()]
+            for task in outstanding:
+                task.cancel()
+            # Let them unwind, so ffmpeg is killed and partial files are closed before the generator returns
+            await asyncio.gather(*outstanding, return_exceptions=True)
+            if journal is not None:
+                journal.flush()
+            if journal_skipped:
+                logger.info(f"Skipped {journal_skipped} URLs already downloaded according to the journal")
+            if deduper is not None and deduper.duplicates:
+                logger.info(f"Dropped {deduper.duplicates} duplicate URLs")
 
     async def download(
         self,
@@ -915,12 +1224,3 @@ class Cobalt:
     async def download(self, *args, **kwargs):
         """Download a file using the deprecated Cobalt class"""
         return await self.manager.download(*args, **kwargs)
-
-
-if Config().get("last_warn", 0, "misc") < time() - 60 * 60 * 24:
-    print("!!! THIS SOFTWARE COMES WITH NO WARRANTY !!!")
-    print(
-        "When downloading files, you are responsible for ensuring the safety of the content. Downloading files from untrusted instances may expose you to malware or other risks."
-    )
-    print("Please use this software responsibly and at your own risk.")
-    Config().set("last_warn", str(time()), "misc")
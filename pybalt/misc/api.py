@@ -1,6 +1,6 @@
 from .. import core, VERSION
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, PlainTextResponse
 from asyncio import sleep, create_task, wait_for, TimeoutError
 import uvicorn
 import sys
@@ -13,7 +13,7 @@ from urllib.parse import urlparse
 
 app = FastAPI()
 manager = core.wrapper.InstanceManager()
-config = core.config.Config()
+config = core.config.get_config()
 
 
 @app.get("/")
@@ -132,11 +132,28 @@ async def webui():
     return HTML_TEMPLATE
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Expose pybalt metrics in the Prometheus text format."""
+    return PlainTextResponse(core.metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.on_event("startup")
 async def startup_event():
     """Start background tasks when the API starts."""
     create_task(update_instances())
 
+    # Apply config file edits to the running manager without a restart
+    watcher = core.config.ConfigWatcher(config)
+    watcher.add_callback(manager.apply_config)
+    watcher.start()
+    app.state.config_watcher = watcher
+
+    # Report anything that blocks the event loop while serving requests
+    loop_monitor = core.loop_monitor.LoopLagMonitor(config)
+    loop_monitor.start()
+    app.state.loop_monitor = loop_monitor
+
 
 async def update_instances():
     """Periodically update the stored_instances list with current instances."""
@@ -152,14 +169,26 @@ async def update_instances():
         await sleep(update_period)
 
 
-def run_api(port=None, **kwargs):
-    """Run the FastAPI application on the specified port or from config."""
+def run_api(port=None, profile=None, **kwargs):
+    """Run the FastAPI application on the specified port or from config, optionally profiling it until it stops."""
     # Use provided port, or get it from kwargs, or from config, or default to 8000
     if port is None:
         port = config.get_as_number("port", 8009, "api")
 
+    profiler = None
+    if profile:
+        from ..core.profiling import Profiler
+
+        profiler = Profiler()
+        profiler.start()
+
     # Run the API server
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    try:
+        uvicorn.run(app, host="0.0.0.0", port=port)
+    finally:
+        if profiler:
+            profiler.stop()
+            profiler.write(profile)
 
 
 HTML_TEMPLATE = (
@@ -1460,5 +1489,10 @@ if __name__ == "__main__":
             # print(f"Invalid port: {sys.argv[1]}")
             sys.exit(1)
 
+    # Optional --profile FILE after the port
+    profile = None
+    if "--profile" in sys.argv[2:-1]:
+        profile = sys.argv[sys.argv.index("--profile") + 1]
+
     # print(f"Starting pybalt API server on port {port or config.get_as_number('port', 8009, 'api')}")
-    run_api(port=port)
+    run_api(port=port, profile=profile)
@@ -6,9 +6,11 @@ import asyncio
 import threading
 from os import path
 from pathlib import Path
-from typing import Dict, List, Optional, Any, TypedDict, Union, Tuple
+from typing import Callable, Dict, List, Optional, Any, TypedDict, Union, Tuple
 from shutil import get_terminal_size
 import sys
+import json
+from urllib.parse import urlparse
 
 try:
     from rich.console import Console
@@ -167,13 +169,40 @@ lprint = Terminal.lprint
 
 
 class DownloadInfo:
-    """Stores information about a download in progress"""
+    """
+    Stores information about a download in progress.
+
+    Returned by Tracker.add_download as a handle, the download loop sets its fields directly
+    and the draw thread samples them, so per-chunk updates need no lock or config lookup.
+    Size changes are also applied to the tracker's running totals, so drawing never has to
+    walk every download.
+    """
+
+    __slots__ = (
+        "url",
+        "filename",
+        "_downloaded_size",
+        "_total_size",
+        "speed",
+        "eta",
+        "start_time",
+        "file_path",
+        "completed",
+        "last_update",
+        "last_size",
+        "iteration",
+        "instance",
+        "_tracker",
+    )
+
+    _fields = ("url", "filename", "downloaded_size", "total_size", "speed", "eta", "start_time", "file_path", "completed")
 
     def __init__(self, url: str, filename: str):
+        self._tracker = None
         self.url = url
         self.filename = filename
-        self.downloaded_size = 0
-        self.total_size = -1
+        self._downloaded_size = 0
+        self._total_size = -1
         self.speed = 0
         self.eta = 0
         self.start_time = time.time()
@@ -182,9 +211,34 @@ class DownloadInfo:
         self.last_update = time.time()
         self.last_size = 0
         self.iteration = 0
+        # Tunnel urls are served by the instance itself
+        self.instance = urlparse(url).netloc
+
+    @property
+    def downloaded_size(self) -> int:
+        return self._downloaded_size
+
+    @downloaded_size.setter
+    def downloaded_size(self, value: int):
+        tracker = self._tracker
+        if tracker is not None:
+            tracker._downloaded += value - self._downloaded_size
+        self._downloaded_size = value
+
+    @property
+    def total_size(self) -> int:
+        return self._total_size
+
+    @total_size.setter
+    def total_size(self, value: int):
+        tracker = self._tracker
+        if tracker is not None:
+            tracker._count_size(self._total_size, -1)
+            tracker._count_size(value, 1)
+        self._total_size = value
 
     def __repr__(self) -> str:
-        values = ", ".join(f"{key}={value!r}" for key, value in self.__dict__.items())
+        values = ", ".join(f"{key}={getattr(self, key)!r}" for key in self._fields)
         return f"{self.__class__.__name__}({values})"
 
 
@@ -207,18 +261,34 @@ class Tracker:
 
     def __init__(self, config=None):
         # Import here to avoid circular imports
-        from pybalt.core.config import Config
+        from pybalt.core.config import get_config
 
         # Store config instance
-        self.config = config or Config()
+        self.config = config or get_config()
         self.downloads: Dict[str, DownloadInfo] = {}
         self.queue: List[str] = []  # Track queued downloads
         self.lock = threading.RLock()
+        self._emitter: Optional[Callable[[Dict[str, Any]], None]] = None
+        self._emit_interval = 1.0
+        self._emit_thread = None
         self._running = False
         self._draw_thread = None
         self._visible = False
+        self._quiet = False
         self._last_draw_time = 0
-        self._min_redraw_interval = self.config.get_as_number("min_redraw_interval", 0.1, "display")  # seconds
+        self._last_line = None
+        self._load_settings()
+
+        # Running totals over active downloads, kept up to date by the DownloadInfo handles
+        self._active = 0
+        self._downloaded = 0
+        self._known_total = 0
+        self._unknown_total = 0
+        # Bytes of downloads that already left the tracker, for the all-time total
+        self._finished = 0
+        self._speed = 0.0
+        self._last_sample_bytes = 0
+        self._last_sample_time = time.time()
 
         # Spinner frames for animation
         self._spinning_chars = ["⢎⡰", "⢎⡡", "⢎⡑", "⢎⠱", "⠎⡱", "⢊⡱", "⢌⡱", "⢆⡱"]
@@ -230,45 +300,51 @@ class Tracker:
         # Backward compatibility for old code
         self.start()
 
+    def _load_settings(self):
+        """Read display settings from config once, they are re-read whenever the tracker starts"""
+
+        def setting(option, fallback, number=False):
+            try:
+                if number:
+                    return self.config.get_as_number(option, fallback, section="display")
+                return self.config.get(option, fallback, section="display")
+            except Exception:
+                return fallback
+
+        self._enabled = setting("enable_tracker", True)
+        self._colors_enabled = setting("enable_colors", True)
+        self._show_path = setting("show_path", True)
+        self._max_filename_length = setting("max_filename_length", 25, number=True)
+        self._progress_bar_width = setting("progress_bar_width", 24, number=True)
+        self._min_redraw_interval = setting("min_redraw_interval", 0.1, number=True)  # seconds
+        self._draw_interval = float(setting("draw_interval", 0.4, number=True))
+        # Redrawing a progress line only makes sense on a terminal
+        self._is_tty = sys.stdout.isatty()
+
     @property
     def enabled(self):
-        """Check if the tracker is enabled in config"""
-        try:
-            return self.config.get("enable_tracker", True, section="display")
-        except Exception:
-            return True
+        """Check if the tracker is enabled in config, an emitter always enables it"""
+        return self._enabled or self._emitter is not None
 
     @property
     def colors_enabled(self):
         """Check if colors are enabled in config"""
-        try:
-            return self.config.get("enable_colors", True, section="display")
-        except Exception:
-            return True
+        return self._colors_enabled
 
     @property
     def should_show_path(self):
         """Check if file paths should be shown"""
-        try:
-            return self.config.get("show_path", True, section="display")
-        except Exception:
-            return True
+        return self._show_path
 
     @property
     def max_filename_length(self):
         """Get the maximum length for filenames from config"""
-        try:
-            return self.config.get_as_number("max_filename_length", 25, section="display")
-        except Exception:
-            return 25
+        return self._max_filename_length
 
     @property
     def progress_bar_width(self):
         """Get the progress bar width from config"""
-        try:
-            return self.config.get_as_number("progress_bar_width", 24, section="display")
-        except Exception:
-            return 24
+        return self._progress_bar_width
 
     def _update_terminal_size(self):
         """Update stored terminal dimensions"""
@@ -361,7 +437,10 @@ class Tracker:
 
     def start(self):
         """Start the tracker display thread"""
-        if not self.enabled or self._running:
+        if self._running:
+            return
+        self._load_settings()
+        if not self.enabled or self._quiet or not self._is_tty or self._emitter is not None:
             return
 
         self._running = True
@@ -397,7 +476,7 @@ class Tracker:
 
                 self._last_draw_time = now
 
-                if (self.downloads or self.queue) and self.enabled:
+                if (self._active or self.queue) and self.enabled:
                     self._update_terminal_size()
                     self._update_downloads(now)
                     self._draw_downloads()
@@ -408,105 +487,179 @@ class Tracker:
             except Exception:
                 # Silently handle drawing errors
                 pass
-            time.sleep(float(self.config.get("draw_interval", 0.4, "display")))
+            time.sleep(self._draw_interval)
+
+    def _count_size(self, total_size: int, sign: int):
+        """Add (sign=1) or remove (sign=-1) a download's total size from the running totals"""
+        if total_size > 0:
+            self._known_total += sign * total_size
+        else:
+            self._unknown_total += sign
+
+    def _attach(self, download: DownloadInfo):
+        """Start counting a download in the running totals, must hold the lock"""
+        self._active += 1
+        self._downloaded += download.downloaded_size
+        self._count_size(download.total_size, 1)
+        download._tracker = self
+
+    def _detach(self, download: DownloadInfo):
+        """Stop counting a download in the running totals, must hold the lock"""
+        if download._tracker is not self:
+            return
+        download._tracker = None
+        self._active -= 1
+        self._downloaded -= download.downloaded_size
+        self._finished += download.downloaded_size
+        self._count_size(download.total_size, -1)
 
     def _update_downloads(self, now: float):
-        """Update download speeds and ETAs"""
-        with self.lock:
-            for download_id, download in self.downloads.items():
-                if not download.completed:
-                    # Update iteration counter for spinner
-                    download.iteration = (download.iteration + 1) % len(self._spinning_chars)
-
-                    # Calculate speed
-                    elapsed = now - download.last_update
-                    if elapsed > 0:
-                        download.speed = (download.downloaded_size - download.last_size) / elapsed
-                        download.last_size = download.downloaded_size
-                        download.last_update = now
-
-                    # Calculate ETA if we know the total size
-                    if download.total_size > 0:
-                        remaining_bytes = download.total_size - download.downloaded_size
-                        if download.speed > 0:
-                            download.eta = remaining_bytes / download.speed
-                        else:
-                            download.eta = 0
+        """Update the aggregate download speed from the running byte total"""
+        all_bytes = self._downloaded + self._finished
+        elapsed = now - self._last_sample_time
+        if elapsed > 0:
+            self._speed = max(0, all_bytes - self._last_sample_bytes) / elapsed
+            if all_bytes != self._last_sample_bytes:
+                # Only spin while bytes are coming in, so an idle line doesn't need redrawing
+                self._spin_index = (self._spin_index + 1) % len(self._spinning_chars)
+            self._last_sample_bytes = all_bytes
+            self._last_sample_time = now
 
     def _draw_downloads(self):
-        """Draw the download status in the terminal"""
-        with self.lock:
-            # Get active downloads (not completed)
-            active_downloads = [d for d in self.downloads.values() if not d.completed]
-
-            if not active_downloads and not self.queue:
-                return
-
-            # Format the status line for active downloads
-            if active_downloads:
-                status_parts = []
-
-                # Calculate total progress if possible
-                all_known_size = all(d.total_size > 0 for d in active_downloads)
-                if all_known_size:
-                    total_downloaded = sum(d.downloaded_size for d in active_downloads)
-                    total_size = sum(d.total_size for d in active_downloads)
-                    percent = min(100, int(total_downloaded / total_size * 100))
-                    progress_bar = self._draw_progress_bar(percent)
-
-                    # Add progress info
-                    status_parts.append(f"⭳ :bold:{len(active_downloads)} active downloads")
-                    status_parts.append(f"{progress_bar} :white:{percent}%")
-                    status_parts.append(f"{self._format_size(total_downloaded)}/{self._format_size(total_size)}")
-                else:
-                    # No progress bar for unknown size
-                    status_parts.append(f"⭳ :bold:{len(active_downloads)} active downloads")
-
-                # Add speed info
-                total_speed = sum(d.speed for d in active_downloads)
-                status_parts.append(f"{self._format_speed(total_speed)}")
-
-                # Add downloaded file size info for all downloads, including finished ones
-                total_downloaded = sum(d.downloaded_size for d in [d for d in self.downloads.values()])
-                status_parts.append(f"{self._format_size(total_downloaded)}")
-
-                # Add spinner
-                status_parts.append(f":white::bold:{self._get_spinner()}")
-
-                # Format status line
-                status_line = " ".join(status_parts)
-
-                # Print the status line
-                lprint(Terminal.apply_style(status_line), end="\r", highlight=False)
-
-            # Show queue status if there are queued downloads
-            if self.queue:
-                queue_status = f":gray:⌛ {len(self.queue)} downloads queued"
-                if active_downloads:
-                    # Print on a new line if we already have active downloads
-                    print()
-                lprint(Terminal.apply_style(queue_status), end="\r", highlight=False)
-
-    def add_download(self, download_id: str, url: str, filename: str):
-        """Add a new download to be tracked"""
-        if not self.enabled:
+        """Draw the download status in the terminal, skipping the write if nothing visible changed"""
+        active = self._active
+        queued = len(self.queue)
+        if not active and not queued:
             return
 
+        lines = []
+        if active:
+            status_parts = [f"⭳ :bold:{active} active downloads"]
+
+            # Show total progress if the size of every active download is known
+            if not self._unknown_total and self._known_total > 0:
+                total_downloaded = self._downloaded
+                percent = min(100, int(total_downloaded / self._known_total * 100))
+                status_parts.append(f"{self._draw_progress_bar(percent)} :white:{percent}%")
+                status_parts.append(f"{self._format_size(total_downloaded)}/{self._format_size(self._known_total)}")
+
+            status_parts.append(self._format_speed(self._speed))
+
+            # Downloaded size of all downloads, including finished ones
+            status_parts.append(self._format_size(self._downloaded + self._finished))
+            status_parts.append(f":white::bold:{self._spinning_chars[self._spin_index]}")
+            lines.append(" ".join(status_parts))
+
+        if queued:
+            lines.append(f":gray:⌛ {queued} downloads queued")
+
+        if lines == self._last_line:
+            return
+        self._last_line = lines
+
+        for i, line in enumerate(lines):
+            if i:
+                # Print on a new line if we already have active downloads
+                print()
+            lprint(Terminal.apply_style(line), end="\r", highlight=False)
+
+    def set_emitter(self, emitter: Optional[Callable[[Dict[str, Any]], None]], interval: float = 1.0):
+        """
+        Replace terminal drawing with progress events.
+
+        The emitter is called with one event per active download every interval seconds, and once more
+        when a download finishes or fails. Events have id, url, filename, instance, phase, bytes, total,
+        speed, eta and time fields.
+
+        Args:
+            emitter: Callable receiving event dicts, None to go back to drawing
+            interval: Seconds between progress events
+        """
+        self._emitter = emitter
+        self._emit_interval = interval
+        if emitter is None:
+            return
+        if self._running:
+            self.stop()
+        if self._emit_thread is None:
+            self._emit_thread = threading.Thread(target=self._emit_loop, daemon=True)
+            self._emit_thread.start()
+
+    def set_quiet(self, quiet: bool = True):
+        """
+        Stop writing to the terminal, e.g. while stdout carries machine-readable output.
+        Neither the progress bar nor completion messages are printed, emitters keep working.
+        """
+        self._quiet = quiet
+        if quiet and self._running:
+            self.stop()
+
+    def emit_event(self, **event):
+        """Send an event to the emitter, if one is set"""
+        emitter = self._emitter
+        if emitter is None:
+            return
+        event.setdefault("time", round(time.time(), 3))
+        try:
+            emitter(event)
+        except Exception:
+            # A broken consumer must not break downloads
+            pass
+
+    def _download_event(self, download_id: str, download: DownloadInfo, phase: str) -> Dict[str, Any]:
+        return {
+            "id": download_id,
+            "url": download.url,
+            "filename": download.filename,
+            "instance": download.instance,
+            "phase": phase,
+            "bytes": download.downloaded_size,
+            "total": download.total_size,
+            "speed": round(download.speed),
+            "eta": round(download.eta, 1),
+        }
+
+    def _emit_loop(self):
+        """Emit a progress event for every active download each interval"""
+        while self._emitter is not None:
+            time.sleep(self._emit_interval)
+            with self.lock:
+                downloads = list(self.downloads.items())
+            for download_id, download in downloads:
+                if not download.completed:
+                    self.emit_event(**self._download_event(download_id, download, "download"))
+        self._emit_thread = None
+
+    def add_download(self, download_id: str, url: str, filename: str) -> Optional[DownloadInfo]:
+        """
+        Add a new download to be tracked.
+
+        Returns:
+            The DownloadInfo handle to update from the download loop, or None if the tracker is disabled
+        """
+        if not self.enabled:
+            return None
+
+        download = DownloadInfo(url, filename)
         with self.lock:
-            self.downloads[download_id] = DownloadInfo(url, filename)
+            previous = self.downloads.get(download_id)
+            if previous is not None:
+                self._detach(previous)
+            self.downloads[download_id] = download
+            self._attach(download)
             if not self._running:
                 self.start()
+        return download
 
     def update_download(self, download_id: str, **kwargs):
-        """Update the status of a download"""
-        if not self.enabled or download_id not in self.downloads:
+        """Update the status of a download, prefer setting fields on the handle from add_download"""
+        download = self.downloads.get(download_id)
+        if download is None:
             return
 
-        with self.lock:
-            download = self.downloads[download_id]
-            for key, value in kwargs.items():
-                if hasattr(download, key):
-                    setattr(download, key, value)
+        for key, value in kwargs.items():
+            if hasattr(download, key):
+                setattr(download, key, value)
 
     def complete_download(self, download_id: str, file_path: Optional[str] = None):
         """Mark a download as completed"""
@@ -524,10 +677,14 @@ class Tracker:
             time_passed = time.time() - download.start_time
 
             # Show completion message
-            self._show_completion_message(download, time_passed)
+            if self._emitter is not None:
+                self.emit_event(**self._download_event(download_id, download, "done"), file_path=str(download.file_path))
+            elif not self._quiet:
+                self._show_completion_message(download, time_passed)
 
             # Remove from tracking
             self.downloads.pop(download_id, None)
+            self._detach(download)
 
             # If no more downloads, stop tracking
             if not self.downloads and not self.queue:
@@ -539,7 +696,10 @@ class Tracker:
             return
 
         with self.lock:
-            self.downloads.pop(download_id, None)
+            download = self.downloads.pop(download_id, None)
+            if download is not None:
+                self._detach(download)
+                self.emit_event(**self._download_event(download_id, download, "failed"))
 
             # If no more downloads, stop tracking
             if not self.downloads and not self.queue:
@@ -555,6 +715,7 @@ class Tracker:
 
             # Clear current line before printing completion message
             print("\r" + " " * self._terminal_width, end="\r")
+            self._last_line = None
 
             if self.should_show_path:
                 lprint(f":green:✔  :white:{download.filename}", f":green:{file_size:.2f}MB :cyan:{time_passed:.2f}s")
@@ -591,11 +752,25 @@ def get_tracker():
     """Get the global tracker instance, initializing if needed"""
     global tracker
     if tracker is None:
-        from pybalt.core.config import Config
+        from pybalt.core.config import get_config
 
-        tracker = Tracker(Config())
+        tracker = Tracker(get_config())
     return tracker
 
 
-# Initialize tracker
-tracker = get_tracker()
+def ndjson_emitter(fd: int = 2) -> Callable[[Dict[str, Any]], None]:
+    """
+    Create a Tracker emitter writing one compact JSON object per line to a file descriptor.
+
+    Usage:
+        get_tracker().set_emitter(ndjson_emitter(3), interval=0.5)
+    """
+    stream = os.fdopen(fd, "w", buffering=1, closefd=False)
+    lock = threading.Lock()
+
+    def emit(event: Dict[str, Any]):
+        line = json.dumps(event, separators=(",", ":"), ensure_ascii=False) + "\n"
+        with lock:
+            stream.write(line)
+
+    return emit
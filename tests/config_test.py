@@ -0,0 +1,92 @@
+import builtins
+import os
+import time
+
+import pytest
+
+from pybalt.core.config import Config, ConfigWatcher, config_override, get_config
+from pybalt.core.wrapper import InstanceManager
+
+
+@pytest.fixture
+def config(config_dir):
+    return Config()
+
+
+def test_set_invalidates_snapshot(config):
+    assert config.get("retry_delay", section="network") == config.snapshot.network.retry_delay
+    config.set("retry_delay", "7", "network")
+    assert config.get("retry_delay", section="network") == 7
+    assert config.snapshot.network.retry_delay == 7
+
+
+def test_file_change_invalidates_snapshot(config):
+    config.get("max_retries", section="network")
+    other = Config()
+    other.set("max_retries", "9", "network")
+    # Make sure the mtime differs even on filesystems with coarse timestamps
+    os.utime(config.config_path, ns=(time.time_ns(), time.time_ns() + 10**9))
+    config._snapshot_checked = 0
+    assert config.get("max_retries", section="network") == 9
+
+
+def test_env_override_and_fallback(config_dir, monkeypatch):
+    monkeypatch.setenv("PYBALT_NETWORK_TIMEOUT", "42")
+    config = Config()
+    assert config.get("timeout", section="network") == 42
+    assert config.get("not_a_setting", "default", "network") == "default"
+
+
+def test_state_is_kept_out_of_settings(config):
+    settings = config.config_path.read_text()
+    config.set_state("last_thank", 123)
+    assert Config().get_state("last_thank") == 123
+    assert config.config_path.read_text() == settings
+
+
+def test_shared_config_and_override(config):
+    shared = get_config()
+    assert get_config() is shared
+    with config_override(config) as override:
+        assert get_config() is override
+    assert get_config() is shared
+
+
+@pytest.mark.asyncio
+async def test_watcher_applies_reload(config):
+    manager = InstanceManager(config=config)
+    fallback = manager.fallback_instance
+    watcher = ConfigWatcher(config, interval=0)
+    watcher.add_callback(manager.apply_config)
+    assert not await watcher.check()
+
+    other = Config()
+    other.set("instance_1", "https://cobalt.example.com", "user_instances")
+    os.utime(config.config_path, ns=(time.time_ns(), time.time_ns() + 10**9))
+    assert await watcher.check()
+    assert [instance.api_url for instance in manager.user_instances] == ["https://cobalt.example.com"]
+    assert manager.fallback_instance is fallback
+
+
+def test_get_serves_from_the_snapshot(config, monkeypatch):
+    snapshot = config.snapshot
+    mtime_checks = []
+
+    def no_io(*args, **kwargs):
+        raise AssertionError("Config.get read the config file")
+
+    monkeypatch.setattr(config, "SNAPSHOT_CHECK_INTERVAL", float("inf"))
+    monkeypatch.setattr(config, "_get_config_mtime", no_io)
+    monkeypatch.setattr(config, "load_config", no_io)
+    monkeypatch.setattr(config, "_resolve", no_io)
+    monkeypatch.setattr(builtins, "open", no_io)
+    for _ in range(100):
+        assert config.get("download_buffer_size", section="network") == snapshot.network.download_buffer_size
+    assert config.snapshot is snapshot
+
+    # Once the interval passes only the mtime is checked, an unchanged file keeps the same snapshot
+    monkeypatch.setattr(config, "SNAPSHOT_CHECK_INTERVAL", 0)
+    monkeypatch.setattr(config, "_get_config_mtime", lambda: mtime_checks.append(1) or snapshot.mtime)
+    config.get("download_buffer_size", section="network")
+    assert config.snapshot is snapshot
+    assert len(mtime_checks) == 2
@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.fixture
+def config_dir(tmp_path, monkeypatch):
+    """Point Config at an empty directory, so tests never read or write the user's settings."""
+    path = tmp_path / "config"
+    path.mkdir()
+    monkeypatch.setenv("PYBALT_CONFIG_DIR", str(path))
+    monkeypatch.delenv("PYBALT_CONFIG_PATH", raising=False)
+    return path
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from pybalt.core.config import Config
+from pybalt.core.journal import Journal
+from pybalt.core.remux import Remuxer
+from pybalt.core.wrapper import InstanceManager
+
+MAX_CONCURRENT = 3
+URLS = [f"https://example.com/{i}" for i in range(20)] + ["https://example.com/0"]
+
+
+@pytest.fixture
+def manager(config_dir, tmp_path, monkeypatch):
+    monkeypatch.setenv("PYBALT_FAST", "1")
+    manager = InstanceManager(config=Config())
+    manager.finished = 0
+
+    async def first_tunnel(url, **params):
+        name = url.rsplit("/", 1)[-1]
+        return {"status": "tunnel", "url": f"https://tunnel.example.com/{name}", "filename": f"{name}.mp4"}
+
+    async def download(url, filename, folder_path, **options):
+        await asyncio.sleep(0.001 * (hash(url) % 5))
+        file_path = tmp_path / filename
+        file_path.write_bytes(b"x" * 2048)
+        manager.finished += 1
+        return file_path
+
+    async def detached_download(**options):
+        return asyncio.create_task(download(**options))
+
+    manager.first_tunnel = first_tunnel
+    manager.client.detached_download = detached_download
+    return manager
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("kind", ["sync", "async"])
+async def test_input_is_read_lazily(manager, tmp_path, kind):
+    pulled = []
+
+    def check_ahead(url):
+        pulled.append(url)
+        # A URL is only taken when a download slot is free
+        assert len(pulled) - manager.finished <= MAX_CONCURRENT
+
+    def sync_urls():
+        for url in URLS:
+            check_ahead(url)
+            yield url
+
+    async def async_urls():
+        for url in URLS:
+            check_ahead(url)
+            yield url
+
+    results = [
+        result
+        async for result in manager.download_generator(
+            urls=sync_urls() if kind == "sync" else async_urls(), only_path=False, max_concurrent=MAX_CONCURRENT, folder_path=tmp_path
+        )
+    ]
+
+    assert pulled == URLS
+    assert sorted(result.url for result in results) == sorted(URLS)
+    # Both copies of the duplicate URL were downloaded
+    assert [result.url for result in results].count("https://example.com/0") == 2
+    assert all(result.error is None for result in results)
+
+
+@pytest.mark.asyncio
+async def test_remux_stage_is_bounded_and_frees_download_slots(manager, tmp_path, monkeypatch):
+    urls = URLS[:6]
+    running, peak, remuxed = 0, 0, 0
+
+    async def downloads_finished():
+        while manager.finished < len(urls):
+            await asyncio.sleep(0.001)
+
+    async def remux_async(self, path, keep_original=None, **kwargs):
+        nonlocal running, peak, remuxed
+        running += 1
+        peak = max(peak, running)
+        # Remuxes only finish once every download is done, which needs the download slots to be free
+        await asyncio.wait_for(downloads_finished(), timeout=5)
+        running -= 1
+        remuxed += 1
+        return path
+
+    monkeypatch.setattr(Remuxer, "remux_async", remux_async)
+    results = [
+        result
+        async for result in manager.download_generator(
+            urls=urls, only_path=False, remux=True, max_concurrent=2, max_concurrent_remuxes=1, folder_path=tmp_path
+        )
+    ]
+
+    assert sorted(result.url for result in results) == sorted(urls)
+    assert all(result.error is None for result in results)
+    assert peak == 1 and remuxed == len(urls)
+
+
+@pytest.mark.asyncio
+async def test_journal_skips_are_logged_once(manager, tmp_path, caplog):
+    urls = URLS[:4]
+    with Journal(tmp_path / "journal.db") as journal:
+        first = [result async for result in manager.download_generator(urls=urls, only_path=False, journal=journal, folder_path=tmp_path)]
+        caplog.clear()
+        second = [result async for result in manager.download_generator(urls=urls, only_path=False, journal=journal, folder_path=tmp_path)]
+
+    assert len(first) == len(urls) and second == []
+    skips = [record.getMessage() for record in caplog.records if "according to the journal" in record.getMessage()]
+    assert skips == ["Skipped 4 URLs already downloaded according to the journal"]
+
+
+@pytest.mark.asyncio
+async def test_closing_early_waits_for_cancelled_downloads(manager, tmp_path):
+    tasks = []
+    detached_download = manager.client.detached_download
+
+    async def stalled_download(**options):
+        if options["url"].endswith("/0"):
+            return await detached_download(**options)
+        tasks.append(asyncio.create_task(asyncio.sleep(60)))
+        return tasks[-1]
+
+    manager.client.detached_download = stalled_download
+    results = manager.download_generator(urls=URLS, only_path=False, max_concurrent=MAX_CONCURRENT, folder_path=tmp_path)
+    assert (await anext(results)).url == URLS[0]
+    await results.aclose()
+
+    assert tasks and all(task.cancelled() for task in tasks)
@@ -0,0 +1,25 @@
+import subprocess
+import sys
+
+# Kept out of `import pybalt`, the CLI is started thousands of times by job runners
+HEAVY_MODULES = ["aiohttp", "requests", "fastapi", "uvicorn", "prompt_toolkit", "rich", "pybalt.core"]
+
+
+def run_python(code: str) -> str:
+    return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.strip()
+
+
+def test_import_has_no_heavy_dependencies():
+    loaded = run_python(f"import sys, pybalt; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    assert loaded == "", f"import pybalt loaded {loaded}"
+
+
+def test_import_time():
+    """Reports the import time, run with -s to see it. Not asserted, it depends on the machine."""
+    elapsed = float(run_python("import time; start = time.perf_counter(); import pybalt; print(time.perf_counter() - start)"))
+    print(f"import pybalt: {elapsed * 1000:.1f}ms")
+
+
+def test_lazy_attributes():
+    output = run_python("import pybalt; print(pybalt.Cobalt.__name__, pybalt.manager is pybalt.core.manager)")
+    assert output.splitlines()[-1] == "Cobalt True"
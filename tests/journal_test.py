@@ -0,0 +1,17 @@
+from pybalt.core.journal import Journal
+
+
+def test_journal_survives_reopen(tmp_path):
+    path = tmp_path / "journal.db"
+    with Journal(path, flush_interval=60) as journal:
+        journal.record("https://example.com/a", Journal.QUEUED)
+        journal.record("https://example.com/a", Journal.DONE, path=tmp_path / "a.mp4")
+        journal.record("https://example.com/b", Journal.DOWNLOADING)
+        # Buffered updates are visible before they are written
+        assert journal.state("https://example.com/a") == Journal.DONE
+
+    with Journal(path) as journal:
+        assert journal.get("https://example.com/a")["path"] == str(tmp_path / "a.mp4")
+        assert journal.state("https://example.com/b") == Journal.DOWNLOADING
+        assert journal.state("https://example.com/c") is None
+        assert journal.counts() == {Journal.DONE: 1, Journal.DOWNLOADING: 1}
@@ -0,0 +1,19 @@
+from pybalt.core.metrics import MetricsRegistry
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    requests = registry.counter("test_requests_total", "Requests made", ["status"])
+    latency = registry.histogram("test_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    requests.inc(status=200)
+    requests.inc(2, status=200)
+    latency.observe(0.5)
+
+    assert registry.counter("test_requests_total", "Requests made", ["status"]) is requests
+    assert requests.get(status=200) == 3
+    text = registry.render()
+    assert "# TYPE test_requests_total counter" in text
+    assert 'test_requests_total{status="200"} 3' in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 0' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 1' in text
+    assert "test_latency_seconds_count 1" in text
@@ -0,0 +1,308 @@
+import asyncio
+import importlib
+import json
+import subprocess
+import sys
+from collections import OrderedDict
+
+import pytest
+from aiohttp import web
+
+from pybalt.core.config import Config
+from pybalt.core.network import HttpClient
+from pybalt.core.remux import INDEX_FILENAME, RemuxError, RemuxIndex, Remuxer
+
+# pybalt.core.remux is the shared remux function, the module is only reachable through the import system
+remux = importlib.import_module("pybalt.core.remux")
+
+# Stands in for ffmpeg: copies the input to the output and reports progress like -progress pipe:1.
+# FAKE_FFMPEG=hang keeps it running, files with "bad" in their name fail like a corrupt input.
+FAKE_FFMPEG = """
+import os, sys, time
+args = sys.argv[1:]
+source, output = args[args.index("-i") + 1], args[-1]
+if os.environ.get("FAKE_FFMPEG") == "hang":
+    open(output, "wb").close()
+    time.sleep(60)
+if "bad" in source + output:
+    sys.stderr.write("Invalid data found when processing input")
+    sys.exit(1)
+data = sys.stdin.buffer.read() if source == "pipe:0" else open(source, "rb").read()
+with open(output, "wb") as f:
+    f.write(data)
+sys.stdout.write("frame=1\\nfps=25.0\\nspeed=1.5x\\nprogress=continue\\nframe=2\\nprogress=end\\n")
+"""
+
+MP4_INFO = {
+    "streams": [{"codec_type": "video"}],
+    "format": {"duration": "1.0", "format_name": "mov,mp4,m4a,3gp,3g2,mj2", "tags": {"major_brand": "isom"}},
+}
+
+
+def box(box_type: bytes, *children: bytes) -> bytes:
+    body = b"".join(children)
+    return (8 + len(body)).to_bytes(4, "big") + box_type + body
+
+
+def write_mp4(path, *boxes: bytes):
+    path.write_bytes(box(b"ftyp", b"isom", b"\0\0\2\0", b"isomiso2avc1mp41") + b"".join(boxes))
+    return path
+
+
+@pytest.mark.parametrize(
+    "boxes",
+    [
+        # ffmpeg -movflags frag_keyframe+empty_moov, still branded isom
+        (box(b"moov", box(b"mvhd", b"\0" * 100), box(b"trak"), box(b"mvex", box(b"trex", b"\0" * 24))), box(b"moof"), box(b"mdat", b"x")),
+        (box(b"moov", box(b"mvhd", b"\0" * 100)), box(b"moof"), box(b"mdat", b"x")),
+    ],
+)
+def test_isom_fragmented_mp4_needs_remux(tmp_path, boxes):
+    path = write_mp4(tmp_path / "video.mp4", *boxes)
+    assert Remuxer.is_fragmented(path)
+    assert Remuxer.needs_remux(path, MP4_INFO)
+
+
+def test_clean_mp4_is_skipped(tmp_path):
+    path = write_mp4(tmp_path / "video.mp4", box(b"moov", box(b"mvhd", b"\0" * 100), box(b"trak")), box(b"mdat", b"x" * 1000))
+    assert not Remuxer.is_fragmented(path)
+    assert not Remuxer.needs_remux(path, MP4_INFO)
+    # mdat before moov, with a 64-bit size
+    mdat = (1).to_bytes(4, "big") + b"mdat" + (16 + 1000).to_bytes(8, "big") + b"x" * 1000
+    path = write_mp4(tmp_path / "late.mp4", mdat, box(b"moov", box(b"mvhd", b"\0" * 100)))
+    assert not Remuxer.needs_remux(path, MP4_INFO)
+
+
+def test_needs_remux_without_a_clean_probe(tmp_path):
+    path = write_mp4(tmp_path / "video.mp4", box(b"moov", box(b"mvhd")), box(b"mdat", b"x"))
+    assert Remuxer.needs_remux(path, None)
+    assert Remuxer.needs_remux(path, {**MP4_INFO, "format": {**MP4_INFO["format"], "duration": "N/A"}})
+    assert Remuxer.needs_remux(tmp_path / "video.webm", MP4_INFO)
+    # A broken box header can't be verified
+    (tmp_path / "broken.mp4").write_bytes(box(b"ftyp", b"isom") + (4).to_bytes(4, "big") + b"moov")
+    assert Remuxer.needs_remux(tmp_path / "broken.mp4", MP4_INFO)
+
+
+@pytest.fixture
+def remuxer(config_dir):
+    return Remuxer(config=Config())
+
+
+@pytest.fixture
+def ffmpeg(tmp_path, monkeypatch):
+    """Run the fake ffmpeg for every command, returns the list of commands started."""
+    script = tmp_path / "ffmpeg.py"
+    script.write_text(FAKE_FFMPEG)
+    commands = []
+    create_subprocess_exec = asyncio.create_subprocess_exec
+
+    async def fake_exec(program, *args, **kwargs):
+        assert program == "ffmpeg"
+        commands.append(args)
+        return await create_subprocess_exec(sys.executable, str(script), *args, **kwargs)
+
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", fake_exec)
+    return commands
+
+
+def test_parse_progress_line():
+    data = {}
+    assert not Remuxer._parse_progress_line(b"frame=12\n", data)
+    assert not Remuxer._parse_progress_line("not a progress line", data)
+    assert Remuxer._parse_progress_line("progress=continue", data)
+    assert data == {"frame": "12", "progress": "continue"}
+
+
+@pytest.mark.asyncio
+async def test_remux_async_replaces_the_file(remuxer, ffmpeg, tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"media")
+    progress = []
+
+    result = await remuxer.remux_async(path, keep_original=False, force=True, progress_callback=lambda **data: progress.append(data))
+
+    assert result == path and path.read_bytes() == b"media"
+    assert not (tmp_path / "rmx_video.mp4").exists()
+    assert [data["progress"] for data in progress] == ["continue", "end"]
+    assert progress[-1]["frame"] == "2"
+
+
+@pytest.mark.asyncio
+async def test_remux_async_raises_on_ffmpeg_error(remuxer, ffmpeg, tmp_path):
+    path = tmp_path / "bad.mp4"
+    path.write_bytes(b"media")
+
+    with pytest.raises(RemuxError, match="Invalid data"):
+        await remuxer.remux_async(path, keep_original=False, force=True)
+    assert path.read_bytes() == b"media"
+    assert not (tmp_path / "rmx_bad.mp4").exists()
+
+
+@pytest.mark.asyncio
+async def test_remux_async_timeout_kills_ffmpeg(remuxer, ffmpeg, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_FFMPEG", "hang")
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"media")
+
+    with pytest.raises(RemuxError, match="timed out"):
+        await remuxer.remux_async(path, force=True, timeout=0.5)
+    assert not (tmp_path / "rmx_video.mp4").exists()
+
+
+@pytest.mark.asyncio
+async def test_remux_async_cancellation_removes_the_output(remuxer, ffmpeg, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_FFMPEG", "hang")
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"media")
+    output = tmp_path / "rmx_video.mp4"
+
+    task = asyncio.create_task(remuxer.remux_async(path, force=True))
+    while not output.exists():
+        await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert not output.exists()
+    assert path.read_bytes() == b"media"
+
+
+@pytest.mark.asyncio
+async def test_remux_async_without_ffmpeg(remuxer, tmp_path, monkeypatch):
+    async def missing(*args, **kwargs):
+        raise FileNotFoundError("ffmpeg")
+
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", missing)
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"media")
+
+    with pytest.raises(RemuxError, match="Failed to start ffmpeg"):
+        await remuxer.remux_async(path, force=True)
+
+
+@pytest.mark.asyncio
+async def test_remux_stream_writes_the_output(remuxer, ffmpeg, tmp_path):
+    output = tmp_path / "video.webm"
+    progress = []
+
+    async with remuxer.stream(output, progress_callback=lambda **data: progress.append(data["progress"])) as sink:
+        for chunk in (b"first ", b"second"):
+            await sink.write(chunk)
+
+    assert output.read_bytes() == b"first second"
+    assert ffmpeg[0][ffmpeg[0].index("-i") + 1] == "pipe:0"
+    assert progress == ["continue", "end"]
+
+
+@pytest.mark.asyncio
+async def test_remux_stream_failure_removes_the_output(remuxer, ffmpeg, tmp_path):
+    output = tmp_path / "bad.webm"
+
+    with pytest.raises(RemuxError, match="Invalid data"):
+        async with remuxer.stream(output) as sink:
+            await sink.write(b"data")
+    assert not output.exists()
+
+
+@pytest.mark.asyncio
+async def test_remux_stream_abort_kills_ffmpeg(remuxer, ffmpeg, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_FFMPEG", "hang")
+    output = tmp_path / "video.webm"
+
+    with pytest.raises(ValueError):
+        async with remuxer.stream(output) as sink:
+            while not output.exists():
+                await asyncio.sleep(0.01)
+            raise ValueError("download failed")
+    assert sink.process.returncode is not None
+    assert not output.exists()
+
+
+@pytest.mark.asyncio
+async def test_stream_remux_failure_is_not_retried(config_dir, ffmpeg, tmp_path, monkeypatch):
+    requests = []
+
+    async def serve(request):
+        requests.append(request.path)
+        return web.Response(body=b"x" * 4096)
+
+    app = web.Application()
+    app.router.add_get("/bad.webm", serve)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    monkeypatch.setattr(Remuxer, "can_stream", staticmethod(lambda filename: True))
+    config = Config()
+    config.set("retry_delay", "0", "network")
+    try:
+        # The caller falls back to remuxing from disk, downloading into ffmpeg again would fail the same way
+        with pytest.raises(RemuxError):
+            await HttpClient(config=config).download_file(
+                url=f"http://127.0.0.1:{port}/bad.webm", filename="bad.webm", folder_path=str(tmp_path), remux_stream=True, retry_count=3
+            )
+    finally:
+        await runner.cleanup()
+    assert requests == ["/bad.webm"]
+
+
+def test_split_remux_args(remuxer, monkeypatch):
+    monkeypatch.setattr(remux, "ffmpeg_capabilities", lambda: {"ffmpeg": True, "ffprobe": True, "hwaccels": {"cuda"}})
+    remuxer.config.set("remux_args", "-hwaccel cuda -movflags +faststart -hwaccel_output_format cuda -an", "ffmpeg")
+    assert remuxer._split_remux_args() == (["-hwaccel", "cuda", "-hwaccel_output_format", "cuda"], ["-movflags", "+faststart", "-an"])
+    # Unsupported hwaccels are dropped, auto is left for ffmpeg to resolve
+    remuxer.config.set("remux_args", "-hwaccel opencl -hwaccel auto", "ffmpeg")
+    assert remuxer._split_remux_args() == (["-hwaccel", "auto"], [])
+
+
+def test_probe_is_cached_until_the_file_changes(remuxer, tmp_path, monkeypatch):
+    monkeypatch.setattr(remux, "_probe_cache", OrderedDict())
+    monkeypatch.setattr(remux, "ffmpeg_capabilities", lambda: {"ffmpeg": True, "ffprobe": True, "hwaccels": set()})
+    calls = []
+
+    def run(command, **kwargs):
+        calls.append(command)
+        return subprocess.CompletedProcess(command, 0, stdout=json.dumps(MP4_INFO).encode())
+
+    monkeypatch.setattr(remux.subprocess, "run", run)
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"media")
+
+    assert remuxer.probe(path) == MP4_INFO
+    assert remuxer.probe(str(path)) == MP4_INFO
+    assert len(calls) == 1
+    path.write_bytes(b"changed media")
+    remuxer.probe(path)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_remux_tree_resumes_from_the_index(config_dir, ffmpeg, tmp_path):
+    root = tmp_path / "media"
+    (root / "season").mkdir(parents=True)
+    for name in ("a.mp4", "season/b.webm", "season/bad.mkv", "notes.txt"):
+        (root / name).write_bytes(b"media")
+
+    stats = await Remuxer(config=Config()).remux_tree(root, jobs=2, keep_original=False, force=True)
+    assert stats == {"total": 3, "done": 2, "failed": 1, "skipped": 0}
+    assert len(ffmpeg) == 3
+
+    # A new process reads the index back and only picks up the failed and the new file
+    (root / "season" / "c.mp4").write_bytes(b"media")
+    stats = await Remuxer(config=Config()).remux_tree(root, jobs=2, keep_original=False, force=True)
+    assert stats == {"total": 4, "done": 3, "failed": 1, "skipped": 2}
+    assert sorted(command[command.index("-i") + 1].rsplit("/", 1)[-1] for command in ffmpeg[3:]) == ["bad.mkv", "c.mp4"]
+
+
+def test_index_ignores_a_cut_off_line_and_changed_files(tmp_path):
+    (tmp_path / "a.mp4").write_bytes(b"media")
+    (tmp_path / "b.mp4").write_bytes(b"media")
+    index = RemuxIndex(tmp_path)
+    index.add(tmp_path / "a.mp4")
+    index.add(tmp_path / "b.mp4")
+    index.close()
+    with open(tmp_path / INDEX_FILENAME, "a") as f:
+        f.write('{"path": "c.mp')
+    (tmp_path / "b.mp4").write_bytes(b"changed media")
+
+    assert RemuxIndex(tmp_path).collect() == ([tmp_path / "b.mp4"], 1)
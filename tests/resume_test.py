@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from pybalt.core import network
+from pybalt.core.config import Config
+from pybalt.core.network import DownloadTiming, HttpClient
+
+BODY = bytes(range(256)) * 1600
+
+
+RANGES = web.AppKey("ranges", list)
+
+
+async def serve_file(request):
+    request.app[RANGES].append(request.headers.get("Range"))
+    start = int(request.headers["Range"].split("=")[1].rstrip("-")) if "Range" in request.headers else 0
+    if start >= len(BODY):
+        return web.Response(status=416, headers={"Content-Range": f"bytes */{len(BODY)}"})
+    if start:
+        return web.Response(status=206, body=BODY[start:], headers={"Content-Range": f"bytes {start}-{len(BODY) - 1}/{len(BODY)}"})
+    return web.Response(body=BODY)
+
+
+@pytest_asyncio.fixture
+async def server():
+    app = web.Application()
+    app[RANGES] = []
+    app.router.add_get("/file", serve_file)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}/file", app[RANGES]
+    await runner.cleanup()
+
+
+@pytest.fixture
+def client(config_dir):
+    config = Config()
+    config.set("download_buffer_size", "100000", "network")
+    config.set("retry_delay", "0", "network")
+    return HttpClient(config=config)
+
+
+@pytest.mark.asyncio
+async def test_resume_survives_a_retry(server, client, tmp_path, monkeypatch):
+    url, ranges = server
+    (tmp_path / "video.mp4").write_bytes(BODY[:40000])
+
+    # Time out the second chunk read, after the first chunk was appended to the partial file
+    wait_for = asyncio.wait_for
+    reads = []
+
+    async def flaky_wait_for(awaitable, timeout):
+        if getattr(awaitable, "cr_code", None) and awaitable.cr_code.co_name == "read":
+            reads.append(1)
+            if len(reads) == 2:
+                awaitable.close()
+                raise asyncio.TimeoutError
+        return await wait_for(awaitable, timeout)
+
+    monkeypatch.setattr(network.asyncio, "wait_for", flaky_wait_for)
+    # Shared with an earlier picker item, durations add up instead of being replaced
+    timing = DownloadTiming()
+    timing.ttfb = 10.0
+    file_path = await client.download_file(url=url, filename="video.mp4", folder_path=str(tmp_path), resume=True, timing=timing)
+
+    assert file_path.read_bytes() == BODY
+    assert timing.retries == 1 and timing.ttfb > 10.0
+    assert ranges[0] == "bytes=40000-"
+    assert len(ranges) == 2 and ranges[1] != ranges[0]
+
+
+@pytest.mark.asyncio
+async def test_resume_of_a_complete_file(server, client, tmp_path):
+    url, ranges = server
+    (tmp_path / "video.mp4").write_bytes(BODY)
+
+    file_path = await client.download_file(url=url, filename="video.mp4", folder_path=str(tmp_path), resume=True)
+
+    assert file_path.read_bytes() == BODY
+    assert ranges == [f"bytes={len(BODY)}-"]
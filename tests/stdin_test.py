@@ -0,0 +1,55 @@
+import asyncio
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+import pybalt.__main__ as cli
+from pybalt.core import logging_utils, network
+from pybalt.core.wrapper import InstanceManager
+
+URLS = ["https://example.com/a", "https://example.com/b", "https://example.com/a"]
+
+
+class StubManager(InstanceManager):
+    """Resolves every URL to a tunnel and writes the file without any network access."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.client.detached_download = self.detached_download
+
+    async def first_tunnel(self, url, **params):
+        name = url.rsplit("/", 1)[-1]
+        return {"status": "tunnel", "url": f"https://tunnel.example.com/{name}", "filename": f"{name}.mp4"}
+
+    async def detached_download(self, url, filename, folder_path, **options):
+        async def download():
+            network.logger.warning(f"Ghost file detected for {url}, retrying")
+            file_path = Path(folder_path) / filename
+            file_path.write_bytes(b"x" * 2048)
+            return file_path
+
+        return asyncio.create_task(download())
+
+
+@pytest.mark.asyncio
+async def test_stdin_mode_writes_only_ndjson_to_stdout(config_dir, tmp_path, monkeypatch, capfd):
+    monkeypatch.setenv("PYBALT_FAST", "1")
+    monkeypatch.setattr(cli, "InstanceManager", StubManager)
+    monkeypatch.setattr(sys, "argv", ["cobalt", "-", "-fp", str(tmp_path)])
+    monkeypatch.setattr(sys, "stdin", io.StringIO("\n".join(URLS) + "\n"))
+    # Start with every console handler on this test's stdout
+    logging_utils.set_console_stream(None)
+    try:
+        await cli.main_async()
+    finally:
+        logging_utils.set_console_stream(None)
+
+    captured = capfd.readouterr()
+    results = [json.loads(line) for line in captured.out.splitlines()]
+    assert sorted(result["url"] for result in results) == URLS[:2]
+    assert all(result["error"] is None for result in results)
+    assert "Ghost file detected" in captured.err
+    assert "Dropped 1 duplicate URLs" in captured.err
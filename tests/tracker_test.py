@@ -0,0 +1,20 @@
+import json
+
+from pybalt.core.config import Config
+from pybalt.misc.tracker import Tracker, ndjson_emitter
+
+
+def test_quiet_tracker_keeps_stdout_ndjson(config_dir, tmp_path, capfd):
+    tracker = Tracker(config=Config())
+    tracker.set_quiet()
+    emit = ndjson_emitter(1)
+
+    file_path = tmp_path / "video.mp4"
+    file_path.write_bytes(b"x" * 2048)
+    for i in range(2):
+        tracker.add_download(str(i), f"https://example.com/{i}", "video.mp4")
+        tracker.complete_download(str(i), str(file_path))
+        emit({"url": f"https://example.com/{i}", "path": str(file_path)})
+
+    lines = capfd.readouterr().out.splitlines()
+    assert [json.loads(line)["url"] for line in lines] == ["https://example.com/0", "https://example.com/1"]
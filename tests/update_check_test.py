@@ -0,0 +1,19 @@
+import pybalt.__main__ as cli
+from pybalt.core.config import Config, config_override
+
+
+def test_update_notice_is_shown_once_per_version(config_dir, capsys):
+    config = Config()
+    with config_override(config):
+        config.set_state("latest_version", "99.0.0")
+        cli.show_update_notice()
+        cli.show_update_notice()
+        assert capsys.readouterr().out.count("A new version of pybalt is available: 99.0.0") == 1
+
+        config.set_state("latest_version", "99.1.0")
+        cli.show_update_notice()
+        assert "99.1.0" in capsys.readouterr().out
+
+        config.set_state("latest_version", cli.VERSION)
+        cli.show_update_notice()
+        assert capsys.readouterr().out == ""
@@ -0,0 +1,27 @@
+from pybalt.core.urls import BloomFilter, Deduper, canonical_key
+
+
+def test_canonical_key_merges_links_to_the_same_video():
+    links = [
+        "https://youtu.be/dQw4w9WgXcQ",
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ&si=abc",
+        "m.youtube.com/shorts/dQw4w9WgXcQ",
+        "HTTPS://YOUTU.BE/dQw4w9WgXcQ",
+    ]
+    assert {canonical_key(link) for link in links} == {"youtube:dQw4w9WgXcQ"}
+    assert canonical_key("https://youtube.com.example.net/watch?v=dQw4w9WgXcQ") != "youtube:dQw4w9WgXcQ"
+    assert canonical_key("https://x.com/user/status/123?s=20") == canonical_key("https://twitter.com/other/status/123")
+    assert canonical_key("HTTPS://www.Example.com/a/?utm_source=x&b=2&a=1#top") == "example.com/a?a=1&b=2"
+
+
+def test_deduper_switches_to_bloom_filter():
+    deduper = Deduper(exact_limit=10, expected_items=1000)
+    urls = [f"https://example.com/{i}" for i in range(100)]
+    assert list(deduper.filter(urls + urls[:5])) == urls
+    assert not deduper.exact
+    assert deduper.duplicates == 5
+
+    bloom = BloomFilter(100)
+    assert not bloom.add("a")
+    assert bloom.add("a")
+    assert "a" in bloom and "b" not in bloom